@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Compare cold and warm load times of folder and view definitions through
+:class:`jenkins_jobs_addons.cache.DefinitionCache`.
+
+Usage::
+
+    python benchmarks/bench_cache.py [--files 500] [--views 10]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import yaml
+
+from jenkins_jobs_addons.cache import DefinitionCache
+
+
+def write_fleet(directory, files, views):
+    for i in range(files):
+        folder = {
+            'name': 'folder-{0}'.format(i),
+            'project-type': 'folder',
+            'primary-view': 'pipeline-0',
+            'health-metrics': ['worst-child-health-metric'],
+            'views': [{'delivery_pipeline': {
+                'name': 'pipeline-{0}'.format(v),
+                'folder': True,
+                'components': [{'name': 'Build',
+                                'first-job': 'folder-{0}/build'.format(i)}],
+                'number-of-pipelines': 3,
+                'sorting': 'none',
+                'show-avatars': False,
+                'update-interval': 1,
+            }} for v in range(views)],
+        }
+        path = os.path.join(directory, 'folder-{0}.yaml'.format(i))
+        with open(path, 'w') as source:
+            yaml.safe_dump([{'job': folder}], source)
+
+
+def loader(path):
+    with open(path) as source:
+        return yaml.safe_load(source)
+
+
+def timed_run(cache, paths):
+    start = time.time()
+    for path in paths:
+        cache.load(path, loader)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--views', type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        source_dir = os.path.join(workdir, 'yaml')
+        os.mkdir(source_dir)
+        write_fleet(source_dir, args.files, args.views)
+        paths = sorted(os.path.join(source_dir, name)
+                       for name in os.listdir(source_dir))
+
+        start = time.time()
+        for path in paths:
+            loader(path)
+        uncached = time.time() - start
+
+        cache = DefinitionCache(os.path.join(workdir, 'cache'),
+                                max_entries=args.files)
+        cold = timed_run(cache, paths)
+        warm = timed_run(cache, paths)
+
+        print('files: {0}, views per file: {1}'.format(
+            args.files, args.views))
+        print('no cache:   {0:8.3f}s'.format(uncached))
+        print('cold cache: {0:8.3f}s'.format(cold))
+        print('warm cache: {0:8.3f}s ({1:.1f}x faster than no cache)'.format(
+            warm, uncached / warm if warm else float('inf')))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+End-to-end scale benchmark: parse, generate and upload synthetic fleets
+(see ``fleet.py``) of growing size against the in-process fake Jenkins of
+the test suite.
+
+Every size runs in a fresh interpreter so the peak RSS of one size does
+not leak into the next. The report lists time, peak RSS and request count
+for each size together with the time per folder relative to the smallest
+size, which stays close to 1 while everything scales linearly.
+
+Usage::
+
+    PYTHONPATH=. python benchmarks/bench_scale.py [--sizes 100,1000,10000]
+        [--workers 8] [--latency 0] [--no-upload] [--json curves.json]
+        [--max-slowdown 2.0]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+from jenkins_jobs.xml_config import XmlJob
+
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import upload
+from jenkins_jobs_addons import views
+from jenkins_jobs_addons import xml_backend
+from tests.fake_registry import Registry
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fleet  # noqa: E402
+
+
+def xml_jobs(definitions):
+    """
+    Build the folder modules of Jenkins Job Builder for ``definitions``.
+    The trees are only serialized by the upload pipeline, so they use the
+    faster XML backend.
+    """
+    project = folders.Folder(None)
+    project_views = views.Views(Registry())
+    for data in definitions:
+        with xml_backend.owned():
+            xml_parent = project.root_xml(data)
+            project_views.gen_xml(None, xml_parent, data)
+        yield XmlJob(xml_parent, data['name'])
+
+
+def peak_rss_mb():
+    # kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak / 1024.0
+
+
+def run_size(size, workers, latency, do_upload):
+    """Measure one fleet size in this process, returns a result dict."""
+    from tests.fake_jenkins import FakeJenkins
+    from jenkins_jobs_addons.remote import JenkinsClient
+
+    workdir = tempfile.mkdtemp()
+    try:
+        paths = fleet.write_fleet(workdir, size)
+
+        start = time.time()
+        definitions = []
+        for path in paths:
+            with open(path) as source:
+                definitions.extend(entry['job']
+                                   for entry in yaml.safe_load(source))
+        parse = time.time() - start
+
+        items = upload.generate(xml_jobs(definitions))
+        requests = 0
+        if do_upload:
+            jenkins = FakeJenkins(latency=latency)
+            jenkins.setUp()
+            try:
+                client = JenkinsClient(jenkins.url)
+                pipeline = upload.UploadPipeline(
+                    upload.client_uploader(client, existing=set()),
+                    workers=workers)
+                failed = pipeline.run(items)
+                requests = jenkins.requests
+            finally:
+                jenkins.cleanUp()
+        else:
+            pipeline = upload.UploadPipeline(lambda name, xml: None,
+                                             workers=workers)
+            failed = pipeline.run(items)
+        if failed:
+            raise RuntimeError('{0} uploads failed, first: {1}'.format(
+                len(failed), failed[0]))
+        stats = pipeline.stats()
+        return {
+            'folders': size,
+            'views': sum(len(d['views']) for d in definitions),
+            'parse_seconds': parse,
+            'generate_seconds': stats['generate']['seconds'],
+            'upload_seconds': stats['upload']['seconds'],
+            'pipeline_seconds': stats['elapsed'],
+            'total_seconds': parse + stats['elapsed'],
+            'bytes': stats['generate']['bytes'],
+            'requests': requests,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    finally:
+        shutil.rmtree(workdir)
+
+
+def run_isolated(size, args):
+    command = [sys.executable, os.path.abspath(__file__),
+               '--single', str(size), '--workers', str(args.workers),
+               '--latency', str(args.latency)]
+    if args.no_upload:
+        command.append('--no-upload')
+    output = subprocess.check_output(command)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def report(results):
+    base = results[0]['total_seconds'] / results[0]['folders']
+    print('{0:>8} {1:>8} {2:>8} {3:>8} {4:>8} {5:>9} {6:>9} {7:>9}'.format(
+        'folders', 'parse', 'generate', 'pipeline', 'us/item', 'slowdown',
+        'rss MB', 'requests'))
+    for result in results:
+        per_item = result['total_seconds'] / result['folders']
+        result['slowdown'] = per_item / base if base else 1.0
+        print('{0:>8} {1:>7.2f}s {2:>7.2f}s {3:>7.2f}s {4:>8.0f} '
+              '{5:>8.2f}x {6:>9.1f} {7:>9}'.format(
+                  result['folders'], result['parse_seconds'],
+                  result['generate_seconds'], result['pipeline_seconds'],
+                  per_item * 1e6, result['slowdown'],
+                  result['peak_rss_mb'], result['requests']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='100,1000,10000',
+                        help='comma separated fleet sizes, up to 100000')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds the fake Jenkins delays requests')
+    parser.add_argument('--no-upload', action='store_true',
+                        help='generate only, skip the fake Jenkins')
+    parser.add_argument('--json', help='write the curves to this file')
+    parser.add_argument('--max-slowdown', type=float, default=None,
+                        help='fail when the time per folder of a size '
+                             'exceeds the smallest size by this factor')
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        result = run_size(args.single, args.workers, args.latency,
+                          not args.no_upload)
+        print(json.dumps(result))
+        return 0
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    results = [run_isolated(size, args) for size in sizes]
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(results, out, indent=2)
+    if args.max_slowdown is not None:
+        worst = max(result['slowdown'] for result in results)
+        if worst > args.max_slowdown:
+            print('time per folder grew {0:.2f}x, more than the allowed '
+                  '{1:.2f}x'.format(worst, args.max_slowdown))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
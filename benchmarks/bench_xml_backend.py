@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Compare the lxml and ElementTree backends of
+:mod:`jenkins_jobs_addons.xml_backend` building and serializing large view
+sets.
+
+Usage::
+
+    python benchmarks/bench_xml_backend.py [--folders 500] [--views 20]
+"""
+import argparse
+import time
+
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import views
+from jenkins_jobs_addons import xml_backend
+
+
+def view_set(count):
+    data = []
+    for i in range(count):
+        data.append((views.delivery_pipeline_view, {
+            'name': 'delivery-{0}'.format(i),
+            'folder': True,
+            'components': [{'name': 'Build', 'first-job': 'build'}],
+            'regexp-first-jobs': ['^build-(.+?)-project'],
+        }))
+        data.append((views.build_pipeline_view, {
+            'name': 'build-{0}'.format(i),
+            'folder': True,
+            'first-job': 'build',
+        }))
+    return data
+
+
+def run(backend, folder_count, view_data):
+    xml_backend.set_backend(backend)
+    folder = folders.Folder(None)
+    build = 0.0
+    serialize = 0.0
+    for i in range(folder_count):
+        start = time.time()
+        with xml_backend.owned():
+            xml_parent = folder.root_xml({'name': 'folder-{0}'.format(i),
+                                          'primary-view': 'delivery-0'})
+        views_xml = xml_backend.SubElement(xml_parent, 'views')
+        for builder, data in view_data:
+            builder(None, views_xml, data)
+        middle = time.time()
+        xml_backend.tostring(xml_parent)
+        build += middle - start
+        serialize += time.time() - middle
+    return build, serialize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--folders', type=int, default=500)
+    parser.add_argument('--views', type=int, default=20,
+                        help='views of each type per folder')
+    args = parser.parse_args()
+
+    view_data = view_set(args.views)
+    print('folders: {0}, views per folder: {1}'.format(
+        args.folders, len(view_data)))
+    for backend in sorted(xml_backend.BACKENDS):
+        build, serialize = run(backend, args.folders, view_data)
+        print('{0:6s} build {1:8.3f}s  serialize {2:8.3f}s  '
+              'total {3:8.3f}s'.format(backend, build, serialize,
+                                       build + serialize))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Generate synthetic fleets of folder definitions for the scale benchmarks.
+
+A fleet is a forest of folders nested up to ``--depth`` levels, each with
+one to ``--views`` views mixing the All, Delivery Pipeline and Build
+Pipeline view types. The same size and seed always produce the same
+fleet, parents before their children.
+
+Usage::
+
+    python benchmarks/fleet.py --folders 10000 --out /tmp/fleet
+"""
+import argparse
+import os
+import random
+
+import yaml
+
+VIEW_TYPES = ('all', 'delivery_pipeline', 'build_pipeline')
+
+
+def view(kind, name, folder):
+    if kind == 'all':
+        return {'all': {'folder': True}}
+    if kind == 'delivery_pipeline':
+        return {'delivery_pipeline': {
+            'name': name,
+            'folder': True,
+            'components': [{'name': 'Build',
+                            'first-job': folder + '/build'}],
+            'number-of-pipelines': 3,
+            'sorting': 'LatestActivity',
+            'show-changes': True,
+            'allow-manual-triggers': True,
+            'update-interval': 5,
+        }}
+    return {'build_pipeline': {
+        'name': name,
+        'folder': True,
+        'first-job': folder + '/build',
+        'build-view-title': name,
+        'display-number-of-builds': 5,
+        'console-output-link-style': 'New Window',
+        'refresh-frequency': 10,
+    }}
+
+
+def fleet(folders, seed=0, depth=4, views=4, top_level=0.05):
+    """
+    Yield ``folders`` folder definitions.
+
+    :arg int seed: Seed of the random layout.
+    :arg int depth: Maximum nesting, 1 keeps every folder top-level.
+    :arg int views: Maximum number of views per folder.
+    :arg float top_level: Share of folders created at the top level.
+    """
+    rng = random.Random(seed)
+    parents = []
+    for index in range(folders):
+        if not parents or rng.random() < top_level:
+            name = 'team-{0}'.format(index)
+        else:
+            name = '{0}/f{1}'.format(rng.choice(parents), index)
+        if name.count('/') + 1 < depth:
+            parents.append(name)
+        folder_views = []
+        kinds = [rng.choice(VIEW_TYPES) for _ in range(rng.randint(1, views))]
+        if 'all' in kinds:
+            kinds = ['all'] + [kind for kind in kinds if kind != 'all']
+        for number, kind in enumerate(kinds):
+            folder_views.append(view(kind, 'view-{0}'.format(number), name))
+        yield {
+            'name': name,
+            'project-type': 'folder',
+            'primary-view': 'All' if kinds[0] == 'all' else 'view-0',
+            'health-metrics': ['worst-child-health-metric'],
+            'views': folder_views,
+        }
+
+
+def write_fleet(directory, folders, per_file=100, **kwargs):
+    """
+    Write a fleet as YAML files of ``per_file`` job definitions each.
+    Returns the list of paths.
+    """
+    paths = []
+    chunk = []
+
+    def flush():
+        path = os.path.join(directory,
+                            'fleet-{0:05d}.yaml'.format(len(paths)))
+        with open(path, 'w') as out:
+            yaml.safe_dump([{'job': job} for job in chunk], out,
+                           default_flow_style=False)
+        paths.append(path)
+        del chunk[:]
+
+    for job in fleet(folders, **kwargs):
+        chunk.append(job)
+        if len(chunk) == per_file:
+            flush()
+    if chunk:
+        flush()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--folders', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--views', type=int, default=4)
+    parser.add_argument('--per-file', type=int, default=100)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+    if not os.path.isdir(args.out):
+        os.makedirs(args.out)
+    paths = write_fleet(args.out, args.folders, per_file=args.per_file,
+                        seed=args.seed, depth=args.depth, views=args.views)
+    print('wrote {0} folders to {1} files in {2}'.format(
+        args.folders, len(paths), args.out))
+
+
+if __name__ == '__main__':
+    main()
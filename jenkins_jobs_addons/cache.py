@@ -0,0 +1,282 @@
+"""
+Cache for parsed folder and view definitions.
+
+Parsing and expanding YAML costs more than generating the XML for folders
+and views, so parsed definitions are stored in :mod:`marshal` format and
+reused for as long as the source file does not change. Ordered mappings,
+as returned by the Jenkins Job Builder YAML loader, are stored as tagged
+lists of pairs and restored on load.
+
+Entries are keyed on the absolute source path and validated against the
+file's mtime, size and SHA-1 content hash. When the mtime changed but the
+content did not, the entry is still used and refreshed. The stat and hash
+are taken from the same read of the file, and a parse result is only
+stored when the file did not change while it was being parsed.
+
+Documents using the Jenkins Job Builder ``!include`` tags are never
+cached: the loader inlines the included files, whose changes the entry
+would not notice.
+
+Writes go to a temporary file that is renamed into place, so several
+processes can share one cache directory. The number of entries is bounded;
+the least recently used ones are evicted first.
+
+Example::
+
+    import yaml
+    from jenkins_jobs_addons.cache import DefinitionCache
+
+    def loader(path):
+        with open(path) as yaml_file:
+            return yaml.safe_load(yaml_file)
+
+    cache = DefinitionCache('~/.cache/jenkins_jobs_addons')
+    data = cache.load('folders/team.yaml', loader)
+"""
+
+import collections
+import errno
+import hashlib
+import marshal
+import os
+import re
+import tempfile
+
+from jenkins_jobs_addons import metrics
+
+CACHE_VERSION = 3
+DEFAULT_MAX_ENTRIES = 4096
+PRUNE_EVERY = 128
+ENTRY_SUFFIX = '.defcache'
+# !include, !include-raw, !include-jinja2 and their variants read files
+INCLUDE_TAG = re.compile(br'!include')
+
+# marshal only stores builtin types; every tuple of the stored data is a tag
+_ORDERED = 'o'
+_TUPLE = 't'
+
+
+def _replace(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError:
+        # Python 2 has no os.replace but rename is atomic on POSIX
+        os.rename(src, dst)
+
+
+def _pack(data):
+    if isinstance(data, dict) and type(data) is not dict:
+        return (_ORDERED, [(_pack(key), _pack(value))
+                           for key, value in data.items()])
+    if isinstance(data, dict):
+        return dict((_pack(key), _pack(value))
+                    for key, value in data.items())
+    if isinstance(data, list):
+        return [_pack(item) for item in data]
+    if isinstance(data, tuple):
+        return (_TUPLE, [_pack(item) for item in data])
+    return data
+
+
+def _unpack(data):
+    if isinstance(data, tuple):
+        tag, items = data
+        if tag == _ORDERED:
+            return collections.OrderedDict(
+                (_unpack(key), _unpack(value)) for key, value in items)
+        return tuple(_unpack(item) for item in items)
+    if isinstance(data, dict):
+        return dict((_unpack(key), _unpack(value))
+                    for key, value in data.items())
+    if isinstance(data, list):
+        return [_unpack(item) for item in data]
+    return data
+
+
+def _read(path):
+    """
+    Returns the stat, SHA-1 and content of ``path``, all taken from the
+    same open file.
+    """
+    with open(path, 'rb') as source:
+        stat = os.fstat(source.fileno())
+        content = source.read()
+    return stat, hashlib.sha1(content).hexdigest(), content
+
+
+def _same_stat(first, second):
+    return (first.st_mtime, first.st_size) == \
+        (second.st_mtime, second.st_size)
+
+
+class DefinitionCache(object):
+
+    """
+    Cache of parsed definitions stored in ``cache_dir``.
+
+    :arg str cache_dir: Directory holding the cache entries. It is created
+      if missing.
+    :arg int max_entries: Maximum number of entries kept on disk.
+    """
+
+    def __init__(self, cache_dir, max_entries=DEFAULT_MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError('max_entries must be at least 1')
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        try:
+            os.makedirs(self.cache_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def _entry_path(self, path):
+        name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + ENTRY_SUFFIX)
+
+    def _read_entry(self, entry_path):
+        try:
+            with open(entry_path, 'rb') as entry_file:
+                entry = marshal.loads(entry_file.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(entry, tuple) or len(entry) != 6:
+            return None
+        if entry[0] != CACHE_VERSION:
+            return None
+        return entry
+
+    def _write_entry(self, entry_path, entry):
+        try:
+            payload = marshal.dumps(entry)
+        except ValueError:
+            # data holds types marshal cannot store, keep it uncached
+            return False
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(payload)
+            _replace(tmp_path, entry_path)
+        except (IOError, OSError):
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+        return True
+
+    def load(self, path, loader):
+        """
+        Return the parsed definition for ``path``.
+
+        :arg str path: The YAML source file.
+        :arg callable loader: Called with ``path`` on a cache miss, must
+          return the parsed data. Its result is not stored when the file
+          changed while it ran or uses ``!include`` tags.
+        """
+        path = os.path.abspath(path)
+        entry_path = self._entry_path(path)
+        entry = self._read_entry(entry_path)
+        if entry is not None and entry[1] != path:
+            entry = None
+
+        stat = os.stat(path)
+        if entry is not None and \
+                (entry[2], entry[3]) == (stat.st_mtime, stat.st_size):
+            self.hits += 1
+            metrics.CACHE_REQUESTS.inc(result='hit')
+            self._touch(entry_path)
+            return _unpack(entry[5])
+        stat, digest, content = _read(path)
+        if entry is not None and entry[4] == digest:
+            self.hits += 1
+            metrics.CACHE_REQUESTS.inc(result='hit')
+            self._write_entry(entry_path, (
+                CACHE_VERSION, path, stat.st_mtime, stat.st_size,
+                digest, entry[5]))
+            return _unpack(entry[5])
+
+        self.misses += 1
+        metrics.CACHE_REQUESTS.inc(result='miss')
+        data = loader(path)
+        if INCLUDE_TAG.search(content):
+            return data
+        after, after_digest, _ = _read(path)
+        if _same_stat(stat, after) and digest == after_digest:
+            self.store(path, data, digest=digest, stat=stat)
+        return data
+
+    def store(self, path, data, digest=None, stat=None):
+        """
+        Store ``data`` as the parsed definition of ``path``.
+        Returns False when the data could not be stored.
+
+        :arg str digest: SHA-1 of the content ``data`` was parsed from,
+          given together with ``stat``. By default both are read from the
+          file now, which must then use no ``!include`` tag.
+        """
+        path = os.path.abspath(path)
+        if digest is None or stat is None:
+            stat, digest, content = _read(path)
+            if INCLUDE_TAG.search(content):
+                return False
+        entry = (CACHE_VERSION, path, stat.st_mtime, stat.st_size,
+                 digest, _pack(data))
+        stored = self._write_entry(self._entry_path(path), entry)
+        if stored:
+            self._stores += 1
+            if self._stores % PRUNE_EVERY == 0:
+                self.prune()
+        return stored
+
+    def _touch(self, entry_path):
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.stat(entry_path).st_mtime, entry_path))
+            except OSError:
+                # removed by another process
+                continue
+        return entries
+
+    def prune(self):
+        """
+        Evict the least recently used entries above ``max_entries``.
+        Returns the number of evicted entries.
+        """
+        entries = self._entries()
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return 0
+        entries.sort()
+        evicted = 0
+        for _, entry_path in entries[:excess]:
+            try:
+                os.unlink(entry_path)
+                evicted += 1
+            except OSError:
+                continue
+        return evicted
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for _, entry_path in self._entries():
+            try:
+                os.unlink(entry_path)
+            except OSError:
+                continue
+
+    def __len__(self):
+        return len(self._entries())
@@ -0,0 +1,145 @@
+"""
+Canonical output and content digests.
+
+Everything the builders emit is rendered the same way whatever the input
+looked like: booleans through :func:`bool_text`, numbers through
+:func:`int_text`, and attributes in sorted order (see
+:mod:`jenkins_jobs_addons.xml_backend`). Equal definitions therefore
+always produce byte for byte equal XML.
+
+The SHA-256 :func:`digest` of an element covers its tag, attributes,
+text and children the way they serialize, not the serialized bytes, so
+it can be computed without serializing. Subtrees whose digest was
+:func:`recorded <record>` while generating, such as every view, are not
+hashed again while they are unchanged: a snapshot of their shape and
+text is kept with the digest and compared instead, which is much cheaper
+than hashing and makes a modified subtree get a fresh digest.
+:func:`digest_of` the root of a job therefore only hashes the few
+elements around them, and sync tools can compare items against the
+digest of what was uploaded before without serializing or fetching them.
+
+Recorded digests are kept for ElementTree elements only, lxml elements
+cannot be referenced weakly and are hashed again every time.
+"""
+
+import binascii
+import hashlib
+import weakref
+
+import six
+
+TRUE_STRINGS = ('true', 'yes', 'on', '1')
+FALSE_STRINGS = ('false', 'no', 'off', '0')
+
+_recorded = weakref.WeakKeyDictionary()
+
+
+def is_bool(value):
+    """
+    Returns whether ``value`` is a boolean option :func:`bool_text` knows:
+    ``True``, ``False`` or one of :data:`TRUE_STRINGS` and
+    :data:`FALSE_STRINGS` in any case.
+    """
+    if isinstance(value, bool):
+        return True
+    if isinstance(value, six.string_types):
+        return value.strip().lower() in TRUE_STRINGS + FALSE_STRINGS
+    return False
+
+
+def bool_text(value):
+    """
+    Render a boolean option, ``True`` and ``'yes'`` both become
+    ``'true'``.
+    """
+    if isinstance(value, six.string_types):
+        text = value.strip().lower()
+        if text in TRUE_STRINGS:
+            return 'true'
+        if text in FALSE_STRINGS:
+            return 'false'
+        return text
+    return 'true' if value else 'false'
+
+
+def int_text(value):
+    """
+    Render a numeric option, integral floats such as ``3.0`` become
+    ``'3'``.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _text(value):
+    # None and '' serialize the same way
+    return (value or '').encode('utf-8')
+
+
+def _fingerprint(element):
+    # everything digest() covers, except the tail of element itself
+    shape = [element.tag, element.text, len(element),
+             tuple(element.attrib.items())]
+    nodes = element.iter()
+    next(nodes)
+    for node in nodes:
+        shape.append((id(node), node.tag, node.text, node.tail, len(node),
+                      tuple(node.attrib.items())))
+    return tuple(shape)
+
+
+def digest(element):
+    """
+    Returns the SHA-256 digest of ``element`` as raw bytes, reusing
+    recorded digests of its subtrees that were not modified since.
+    """
+    try:
+        value, shape = _recorded[element]
+    except (KeyError, TypeError):
+        pass
+    else:
+        if shape == _fingerprint(element):
+            return value
+    sha = hashlib.sha256()
+    tag = element.tag
+    if not isinstance(tag, six.string_types):
+        # comments and processing instructions
+        tag = '!' + getattr(tag, '__name__', str(tag))
+    sha.update(_text(tag))
+    for name, value in sorted(element.attrib.items()):
+        sha.update(b'\0' + _text(name) + b'=' + _text(value))
+    sha.update(b'\1' + _text(element.text))
+    # the tail belongs to the parent, a child's digest stays valid when
+    # it is indented after recording
+    for child in element:
+        sha.update(b'\2' + digest(child) + _text(child.tail))
+    return sha.digest()
+
+
+def record(element, known=None):
+    """
+    Compute and remember the digest of a finished subtree. Returns the
+    hexadecimal digest.
+
+    :arg str known: Hexadecimal digest of an equal subtree, such as the
+      one ``element`` was copied from, used instead of hashing it again.
+    """
+    if known is None:
+        value = digest(element)
+    else:
+        value = binascii.unhexlify(known)
+    try:
+        _recorded[element] = (value, _fingerprint(element))
+    except TypeError:
+        pass
+    return _hex(value)
+
+
+def digest_of(element):
+    """Returns the hexadecimal digest of ``element``."""
+    return _hex(digest(element))
+
+
+def _hex(value):
+    return binascii.hexlify(value).decode('ascii')
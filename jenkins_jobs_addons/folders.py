@@ -7,19 +7,34 @@ Requires the Jenkins `CloudBees Folder Plugin.
 <CloudBees+Folder+Plugin>`_
 
     :arg str primary-view: Name of the default view to show for this folder.
+      Must be one of the ``views`` of the folder when it has any.
     :arg list health-metrics: A list of metrics to use as a health check. Must
       be one of the following:
         * **worst-child-health-metric**
+    :arg list libraries: Pipeline shared libraries available to every job
+      in this folder. See :func:`libraries`.
+    :arg dict build-discarder: Default build retention for every job in
+      this folder. See :func:`build_discarder`.
+    :arg dict view-defaults: Default options of the views of this folder by
+      view type. See :mod:`jenkins_jobs_addons.views`.
 
 Job example:
 
     .. literalinclude::
       /../tests/folders/fixtures/folders.yaml
 
+Shared libraries example:
+
+    .. literalinclude::
+      /../tests/folders/fixtures/folder_libraries.yaml
+
 """
 
-import xml.etree.ElementTree as XML
 import jenkins_jobs.modules.base
+from jenkins_jobs_addons import metrics
+from jenkins_jobs_addons import plugins
+from jenkins_jobs_addons import xml_backend as XML
+from jenkins_jobs_addons.canonical import bool_text
 
 FOLDER_CLASS = 'com.cloudbees.hudson.plugins.folder.Folder'
 METRIC_CLASS = 'com.cloudbees.hudson.plugins.folder.health.'\
@@ -29,6 +44,204 @@ SUPPORTED_METRICS = {
     'worst-child-health-metric':
     'com.cloudbees.hudson.plugins.folder.health.WorstChildHealthMetric'
 }
+LIBRARIES_CLASS = 'org.jenkinsci.plugins.workflow.libs.FolderLibraries'
+LIBRARY_CLASS = 'org.jenkinsci.plugins.workflow.libs.LibraryConfiguration'
+RETRIEVER_CLASS = 'org.jenkinsci.plugins.workflow.libs.SCMSourceRetriever'
+GIT_SOURCE_CLASS = 'jenkins.plugins.git.GitSCMSource'
+BRANCH_DISCOVERY_TRAIT = 'jenkins.plugins.git.traits.BranchDiscoveryTrait'
+DISCARDER_CLASS = 'com.cloudbees.hudson.plugins.folder.properties.'\
+                  'FolderBuildDiscarderProperty'
+
+# First plugin versions accepting each field, see jenkins_jobs_addons.plugins
+FOLDER_EMITTER = plugins.Emitter(('cloudbees-folder',), {
+    DISCARDER_CLASS: '6.16',
+}, options={
+    DISCARDER_CLASS: 'build-discarder',
+})
+LIBRARIES_EMITTER = plugins.Emitter(
+    ('pipeline-groovy-lib', 'workflow-cps-global-lib'), {
+        'includeInChangesets': '2.12',
+        'cachingConfiguration': '2.21',
+    }, options={
+        'includeInChangesets': 'include-in-changesets',
+        'cachingConfiguration': 'caching',
+    })
+
+
+def requested_options(data):
+    """
+    Returns the names of the folder and library options set in ``data``,
+    see :meth:`jenkins_jobs_addons.plugins.Emitter.warn`.
+    """
+    requested = set(data)
+    for library in data.get('libraries') or []:
+        requested.update(library)
+    return requested
+
+
+def libraries(xml_parent, data, unsupported=frozenset()):
+    """
+    Folder level Pipeline shared libraries. Requires the Jenkins `Pipeline
+    Shared Groovy Libraries Plugin.
+    <https://plugins.jenkins.io/workflow-cps-global-lib>`_
+
+    Each entry of the list supports:
+
+    :arg str name: Name used to load the library (required).
+    :arg str default-version: Branch, tag or revision loaded by default.
+    :arg bool implicit: Load the library implicitly in every build.
+      (default false)
+    :arg bool allow-version-override: Allow builds to select another
+      version. (default true)
+    :arg bool include-in-changesets: Show library changes in the build's
+      change sets. (default true)
+    :arg dict scm: Where to retrieve the library from. Only ``git`` is
+      supported:
+
+        * **remote** (str): Repository URL (required).
+        * **credentials-id** (str): Credentials used to check it out.
+
+    :arg dict caching: Cache retrieved library versions on the controller
+      instead of checking them out for every build:
+
+        * **refresh-minutes** (int): Minutes before a cached version is
+          refreshed, 0 never refreshes. (default 0)
+        * **excluded-versions** (list): Versions that are never cached.
+
+    Fields in ``unsupported``, as resolved by :data:`LIBRARIES_EMITTER`,
+    are left out.
+    """
+    folder_libraries = XML.SubElement(xml_parent, LIBRARIES_CLASS)
+    xml_libraries = XML.SubElement(folder_libraries, 'libraries')
+    for library in data:
+        name = library.get('name')
+        if not name:
+            raise ValueError('every library must have a name')
+        xml_library = XML.SubElement(xml_libraries, LIBRARY_CLASS)
+        XML.SubElement(xml_library, 'name').text = name
+
+        scm = library.get('scm', {})
+        if list(scm.keys()) != ['git']:
+            raise ValueError('library {0} must have a git scm'.format(name))
+        git = scm['git']
+        remote = git.get('remote')
+        if not remote:
+            raise ValueError('library {0} needs a git remote'.format(name))
+        retriever = XML.SubElement(xml_library, 'retriever',
+                                   attrib={'class': RETRIEVER_CLASS})
+        source = XML.SubElement(retriever, 'scm',
+                                attrib={'class': GIT_SOURCE_CLASS})
+        XML.SubElement(source, 'id').text = name
+        XML.SubElement(source, 'remote').text = remote
+        credentials_id = git.get('credentials-id')
+        if credentials_id:
+            XML.SubElement(source, 'credentialsId').text = credentials_id
+        traits = XML.SubElement(source, 'traits')
+        XML.SubElement(traits, BRANCH_DISCOVERY_TRAIT)
+
+        default_version = library.get('default-version')
+        if default_version:
+            XML.SubElement(xml_library, 'defaultVersion').text = \
+                default_version
+
+        implicit = library.get('implicit', False)
+        XML.SubElement(xml_library, 'implicit').text = bool_text(implicit)
+
+        override = library.get('allow-version-override', True)
+        XML.SubElement(
+            xml_library, 'allowVersionOverride').text = bool_text(override)
+
+        if 'includeInChangesets' not in unsupported:
+            changesets = library.get('include-in-changesets', True)
+            XML.SubElement(xml_library, 'includeInChangesets').text = \
+                bool_text(changesets)
+
+        caching = library.get('caching')
+        if caching is None:
+            continue
+        refresh = caching.get('refresh-minutes', 0)
+        if not isinstance(refresh, int) or isinstance(refresh, bool) or \
+                refresh < 0:
+            raise ValueError('refresh-minutes of library {0} must be a '
+                             'non-negative integer'.format(name))
+        excluded = caching.get('excluded-versions', [])
+        if not isinstance(excluded, list):
+            excluded = str(excluded).split()
+        if 'cachingConfiguration' in unsupported:
+            continue
+        xml_caching = XML.SubElement(xml_library, 'cachingConfiguration')
+        XML.SubElement(xml_caching, 'refreshTimeMinutes').text = str(refresh)
+        XML.SubElement(
+            xml_caching, 'excludedVersionsStr').text = ' '.join(excluded)
+
+
+def build_discarder(xml_parent, data, unsupported=frozenset()):
+    """
+    Default build discarder applied to the jobs of a folder, keeping the
+    build records Jenkins loads bounded. Requires the Jenkins `CloudBees
+    Folder Plugin. <https://plugins.jenkins.io/cloudbees-folder>`_
+
+    :arg int days-to-keep: Number of days to keep builds for (default -1)
+    :arg int num-to-keep: Number of builds to keep (default -1)
+    :arg int artifact-days-to-keep: Number of days to keep builds with
+      artifacts (default -1)
+    :arg int artifact-num-to-keep: Number of builds with artifacts to keep
+      (default -1)
+
+    Values must be positive or -1 to keep everything, and at least one of
+    ``days-to-keep`` and ``num-to-keep`` must be set. Nothing is added when
+    ``unsupported``, as resolved by :data:`FOLDER_EMITTER`, contains the
+    property.
+    """
+    mappings = [
+        ('days-to-keep', 'daysToKeep'),
+        ('num-to-keep', 'numToKeep'),
+        ('artifact-days-to-keep', 'artifactDaysToKeep'),
+        ('artifact-num-to-keep', 'artifactNumToKeep'),
+    ]
+    unknown = set(data) - set(key for key, _ in mappings)
+    if unknown:
+        raise ValueError('unknown build-discarder options {0}'.format(
+            sorted(unknown)))
+    for key, _ in mappings:
+        value = data.get(key, -1)
+        if not isinstance(value, int) or isinstance(value, bool) or \
+                (value < 1 and value != -1):
+            raise ValueError('build-discarder {0} must be a positive '
+                             'integer or -1'.format(key))
+    if data.get('days-to-keep', -1) == -1 and \
+            data.get('num-to-keep', -1) == -1:
+        raise ValueError('build-discarder needs days-to-keep or '
+                         'num-to-keep')
+    if DISCARDER_CLASS in unsupported:
+        return
+
+    discarder = XML.SubElement(xml_parent, DISCARDER_CLASS)
+    strategy = XML.SubElement(discarder, 'strategy',
+                              attrib={'class': 'hudson.tasks.LogRotator'})
+    for key, tag in mappings:
+        XML.SubElement(strategy, tag).text = str(data.get(key, -1))
+
+
+FOLDER_PROPERTIES = [
+    ('libraries', libraries),
+    ('build-discarder', build_discarder),
+]
+
+
+def folder_properties(registry, xml_parent, data):
+    """
+    Add the :data:`FOLDER_PROPERTIES` set in ``data`` to ``xml_parent``,
+    leaving out the fields the installed plugins reject.
+    """
+    unsupported = FOLDER_EMITTER.unsupported(registry) | \
+        LIBRARIES_EMITTER.unsupported(registry)
+    for key, builder in FOLDER_PROPERTIES:
+        if key in data:
+            builder(xml_parent, data[key], unsupported)
+    requested = requested_options(data)
+    FOLDER_EMITTER.warn(registry, requested)
+    LIBRARIES_EMITTER.warn(registry, requested)
 
 
 class Folder(jenkins_jobs.modules.base.Base):
@@ -44,15 +257,23 @@ class Folder(jenkins_jobs.modules.base.Base):
         Returns xml representing a job
         :arg dict data: the YAML data structure
         """
+        started = metrics.start()
         xml_parent = XML.Element(FOLDER_CLASS)
         XML.SubElement(xml_parent, 'icon', attrib={'class': STOCK_FOLDER_ICON})
 
         health_metrics = data.get('health-metrics', [])
-        metrics = XML.SubElement(xml_parent, 'healthMetrics')
+        xml_metrics = XML.SubElement(xml_parent, 'healthMetrics')
         for health_metric in health_metrics:
             if health_metric in SUPPORTED_METRICS.keys():
-                XML.SubElement(metrics, SUPPORTED_METRICS.get(health_metric))
+                XML.SubElement(xml_metrics,
+                               SUPPORTED_METRICS.get(health_metric))
 
         primary_view = data.get('primary-view')
         XML.SubElement(xml_parent, 'primaryView').text = primary_view
+
+        if any(key in data for key, _ in FOLDER_PROPERTIES):
+            properties = XML.SubElement(xml_parent, 'properties')
+            folder_properties(self.registry, properties, data)
+        metrics.ITEMS_GENERATED.inc(type='folder')
+        metrics.GENERATE_SECONDS.observe_since(started, stage='root')
         return xml_parent
@@ -0,0 +1,272 @@
+"""
+Run metrics in the Prometheus text format.
+
+Counters and histograms are collected over a whole generation or sync
+run: items and views generated per type, generation latency, definition
+cache hits, bytes emitted, upload outcomes and pruned items. At the end of
+the run they are written to a file that the node exporter textfile
+collector, or any other scraper of the text format, can pick up.
+
+Collection is off unless :func:`enable` was called or the
+``JJB_ADDONS_METRICS_FILE`` environment variable names the file to write
+when the interpreter exits. While it is off every update returns after a
+single attribute check.
+
+Example::
+
+    from jenkins_jobs_addons import metrics
+
+    metrics.enable()
+    ... generate and upload ...
+    metrics.write('/var/lib/node_exporter/jjb.prom')
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+
+from jenkins_jobs_addons import output
+
+METRICS_FILE_ENV = 'JJB_ADDONS_METRICS_FILE'
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _number(value):
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n') \
+        .replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(name, _escape(value))
+                          for name, value in pairs) + '}'
+
+
+class Metric(object):
+
+    """
+    Base of :class:`Counter` and :class:`Histogram`.
+
+    :arg str name: Metric name, ``jjb_addons_`` by convention.
+    :arg str documentation: HELP text.
+    :arg tuple labelnames: Names of the labels every update must give.
+    """
+
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError('{0} needs the labels {1}'.format(
+                self.name, list(self.labelnames)))
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = ['# HELP {0} {1}'.format(self.name, self.documentation),
+                 '# TYPE {0} {1}'.format(self.name, self.kind)]
+        with self._lock:
+            for key in sorted(self._values):
+                lines.extend(self._render_value(key, self._values[key]))
+        return lines
+
+
+class Counter(Metric):
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _render_value(self, key, value):
+        yield '{0}{1} {2}'.format(self.name, _labels(self.labelnames, key),
+                                  _number(value))
+
+
+class Histogram(Metric):
+
+    """
+    :arg tuple buckets: Upper bounds of the buckets, in seconds for
+      latencies.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(registry, name, documentation,
+                                        labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # one count per bucket, then +Inf, then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) \
+                    + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def observe_since(self, started, **labels):
+        """Observe the seconds elapsed since :func:`start` returned."""
+        if started is not None:
+            self.observe(time.time() - started, **labels)
+
+    def count(self, **labels):
+        counts = self._values.get(self._key(labels))
+        return sum(counts[:-1]) if counts else 0
+
+    def _render_value(self, key, counts):
+        cumulative = 0
+        bounds = [_number(bound) for bound in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            yield '{0}_bucket{1} {2}'.format(
+                self.name,
+                _labels(self.labelnames, key, [('le', bound)]),
+                cumulative)
+        labels = _labels(self.labelnames, key)
+        yield '{0}_sum{1} {2}'.format(self.name, labels, _number(counts[-1]))
+        yield '{0}_count{1} {2}'.format(self.name, labels, cumulative)
+
+
+class Registry(object):
+
+    """
+    Set of metrics written together.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(self, name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        metric = Histogram(self, name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+    def render(self):
+        """Returns every metric in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write :meth:`render` to ``path`` through a temporary file, so a
+        scraper never reads half a file.
+        """
+        output.atomic_write(path, self.render())
+
+
+REGISTRY = Registry()
+
+ITEMS_GENERATED = REGISTRY.counter(
+    'jjb_addons_items_generated_total',
+    'Folders, multibranch projects and organization folders generated.',
+    ('type',))
+VIEWS_GENERATED = REGISTRY.counter(
+    'jjb_addons_views_generated_total', 'Views generated.', ('type',))
+GENERATE_SECONDS = REGISTRY.histogram(
+    'jjb_addons_generate_seconds',
+    'Time spent generating the root of an item or all of its views.',
+    ('stage',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'jjb_addons_definition_cache_requests_total',
+    'Definition cache lookups by result.', ('result',))
+BYTES_EMITTED = REGISTRY.counter(
+    'jjb_addons_bytes_emitted_total', 'Bytes of XML serialized for upload.')
+UPLOADS = REGISTRY.counter(
+    'jjb_addons_uploads_total', 'Item uploads by outcome.', ('outcome',))
+UPLOAD_SECONDS = REGISTRY.histogram(
+    'jjb_addons_upload_seconds', 'Time spent uploading one item.')
+PRUNED = REGISTRY.counter(
+    'jjb_addons_pruned_total', 'Pruned items by kind and outcome.',
+    ('kind', 'outcome'))
+
+
+def enabled():
+    return REGISTRY.enabled
+
+
+def enable(on=True):
+    """Turn collection on, or off with ``on=False``."""
+    REGISTRY.enabled = on
+
+
+def start():
+    """
+    Returns the current time to pass to :meth:`Histogram.observe_since`,
+    or None while collection is off.
+    """
+    if REGISTRY.enabled:
+        return time.time()
+    return None
+
+
+def write(path):
+    """Write every metric of the default registry to ``path``."""
+    REGISTRY.write(path)
+
+
+def _write_at_exit(path):
+    try:
+        write(path)
+    except (IOError, OSError) as e:
+        sys.stderr.write('cannot write metrics to {0}: {1}\n'.format(
+            path, e))
+
+
+if os.environ.get(METRICS_FILE_ENV):
+    enable()
+    atexit.register(_write_at_exit, os.environ[METRICS_FILE_ENV])
@@ -0,0 +1,342 @@
+"""
+Multibranch Pipelines and organization folders. Specify ``multibranch`` or
+``organization-folder`` in the ``project-type`` attribute of the
+:ref:`Job` definition.
+
+Requires the Jenkins `Branch API Plugin
+<https://plugins.jenkins.io/branch-api>`_ and `Pipeline: Multibranch Plugin
+<https://plugins.jenkins.io/workflow-multibranch>`_.
+
+Both project types accept ``health-metrics``, ``libraries`` and
+``build-discarder`` like :mod:`jenkins_jobs_addons.folders` as well as:
+
+    :arg str periodic-folder-trigger: How often to rescan branches or
+      repositories when no webhook arrived. One of ``1m``, ``2m``, ``5m``,
+      ``10m``, ``15m``, ``20m``, ``25m``, ``30m``, ``1h``, ``2h``, ``4h``,
+      ``8h``, ``12h``, ``1d``, ``2d``, ``1w``, ``2w`` or ``4w``. Every
+      trigger uses ``H`` in its schedule so Jenkins spreads the scans of
+      different items over the hour instead of starting them together.
+    :arg dict orphaned-item-strategy: What to do with branches or
+      repositories that disappeared. See :func:`orphaned_item_strategy`.
+    :arg list build-strategies: Which discovered heads get built
+      automatically. See :func:`build_strategies`.
+    :arg str script-path: Path of the Pipeline script in each branch.
+      (default Jenkinsfile)
+
+A ``multibranch`` project takes its branches from:
+
+    :arg list scm: Branch sources, only ``git`` is supported:
+
+        * **remote** (str): Repository URL (required).
+        * **credentials-id** (str): Credentials used to scan it.
+        * **id** (str): Source id, defaults to the remote.
+
+An ``organization-folder`` scans the repositories of:
+
+    :arg dict github: GitHub organization or user:
+
+        * **repo-owner** (str): Organization or user name (required).
+        * **credentials-id** (str): Credentials used to scan it.
+        * **api-uri** (str): GitHub Enterprise API endpoint.
+
+Job examples:
+
+    .. literalinclude::
+      /../tests/multibranch/fixtures/multibranch.yaml
+
+    .. literalinclude::
+      /../tests/multibranch/fixtures/organization_folder.yaml
+
+"""
+
+import jenkins_jobs.modules.base
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import metrics
+from jenkins_jobs_addons import xml_backend as XML
+from jenkins_jobs_addons.canonical import bool_text
+
+MULTIBRANCH_CLASS = 'org.jenkinsci.plugins.workflow.multibranch.'\
+                    'WorkflowMultiBranchProject'
+ORGANIZATION_CLASS = 'jenkins.branch.OrganizationFolder'
+ORPHANED_ITEM_CLASS = 'com.cloudbees.hudson.plugins.folder.computed.'\
+                      'DefaultOrphanedItemStrategy'
+PERIODIC_TRIGGER_CLASS = 'com.cloudbees.hudson.plugins.folder.computed.'\
+                         'PeriodicFolderTrigger'
+BASIC_STRATEGIES = 'jenkins.branch.buildstrategies.basic.'
+GITHUB_NAVIGATOR_CLASS = 'org.jenkinsci.plugins.github__branch__source.'\
+                         'GitHubSCMNavigator'
+GITHUB_BRANCH_TRAIT = 'org.jenkinsci.plugins.github__branch__source.'\
+                      'BranchDiscoveryTrait'
+
+# interval name: (cron spec, interval in milliseconds)
+SCAN_INTERVALS = {
+    '1m': ('* * * * *', 60000),
+    '2m': ('H/2 * * * *', 120000),
+    '5m': ('H/5 * * * *', 300000),
+    '10m': ('H/10 * * * *', 600000),
+    '15m': ('H/15 * * * *', 900000),
+    '20m': ('H/20 * * * *', 1200000),
+    '25m': ('H/5 * * * *', 1500000),
+    '30m': ('H/30 * * * *', 1800000),
+    '1h': ('H * * * *', 3600000),
+    '2h': ('H * * * *', 7200000),
+    '4h': ('H * * * *', 14400000),
+    '8h': ('H * * * *', 28800000),
+    '12h': ('H H * * *', 43200000),
+    '1d': ('H H * * *', 86400000),
+    '2d': ('H H * * *', 172800000),
+    '1w': ('H H * * *', 604800000),
+    '2w': ('H H * * *', 1209600000),
+    '4w': ('H H * * *', 2419200000),
+}
+
+
+def _owner(xml_parent, jenkins_class):
+    XML.SubElement(xml_parent, 'owner',
+                   attrib={'class': jenkins_class, 'reference': '../..'})
+
+
+def _keep_value(data, key):
+    value = data.get(key, -1)
+    if not isinstance(value, int) or isinstance(value, bool) or \
+            (value < 1 and value != -1):
+        raise ValueError('{0} must be a positive integer or -1'.format(key))
+    return str(value)
+
+
+def _tag_age_millis(options, key):
+    days = options.get(key, -1)
+    if not isinstance(days, int) or isinstance(days, bool) or days < -1:
+        raise ValueError('{0} must be a non-negative integer or -1'.format(
+            key))
+    return str(days * 86400000 if days > 0 else -1)
+
+
+def orphaned_item_strategy(xml_parent, data):
+    """
+    Orphaned item strategy of a multibranch project or organization folder.
+
+    :arg bool prune-dead-branches: Remove items whose branch or repository
+      is gone. (default true)
+    :arg int days-to-keep: Days to keep removed items for, -1 keeps them
+      regardless of age. (default -1)
+    :arg int number-to-keep: Number of removed items to keep, -1 keeps them
+      all. (default -1)
+    :arg bool abort-builds: Abort running builds of removed items.
+      (default false)
+    """
+    strategy = XML.SubElement(xml_parent, 'orphanedItemStrategy',
+                              attrib={'class': ORPHANED_ITEM_CLASS})
+    prune = data.get('prune-dead-branches', True)
+    XML.SubElement(strategy, 'pruneDeadBranches').text = bool_text(prune)
+    XML.SubElement(
+        strategy, 'daysToKeep').text = _keep_value(data, 'days-to-keep')
+    XML.SubElement(
+        strategy, 'numToKeep').text = _keep_value(data, 'number-to-keep')
+    abort = data.get('abort-builds', False)
+    XML.SubElement(strategy, 'abortBuilds').text = bool_text(abort)
+
+
+def periodic_folder_trigger(xml_parent, interval):
+    if interval not in SCAN_INTERVALS:
+        raise ValueError('periodic-folder-trigger must be one of {0}'.format(
+            sorted(SCAN_INTERVALS, key=lambda i: SCAN_INTERVALS[i][1])))
+    spec, millis = SCAN_INTERVALS[interval]
+    trigger = XML.SubElement(xml_parent, PERIODIC_TRIGGER_CLASS)
+    XML.SubElement(trigger, 'spec').text = spec
+    XML.SubElement(trigger, 'interval').text = str(millis)
+
+
+def build_strategies(xml_parent, data):
+    """
+    Build strategies from the Jenkins `Basic Branch Build Strategies Plugin.
+    <https://plugins.jenkins.io/basic-branch-build-strategies>`_
+
+    :arg list build-strategies: Any of:
+
+        * **regular-branches**: Build branches when a change is detected.
+        * **skip-initial-build**: Do not build everything on the first
+          indexing.
+        * **change-requests** (dict): Build pull requests.
+
+            * **ignore-target-only-changes** (bool) (default false)
+
+        * **tags** (dict): Build tags.
+
+            * **ignore-tags-newer-than** (int) Days. (default -1)
+            * **ignore-tags-older-than** (int) Days. (default -1)
+    """
+    strategies = XML.SubElement(xml_parent, 'buildStrategies')
+    for strategy in data:
+        if isinstance(strategy, dict):
+            (name, options), = strategy.items()
+        else:
+            name, options = strategy, {}
+        options = options or {}
+
+        if name == 'regular-branches':
+            XML.SubElement(strategies,
+                           BASIC_STRATEGIES + 'BranchBuildStrategyImpl')
+        elif name == 'skip-initial-build':
+            XML.SubElement(
+                strategies,
+                BASIC_STRATEGIES + 'SkipInitialBuildOnFirstBranchIndexing')
+        elif name == 'change-requests':
+            xml_strategy = XML.SubElement(
+                strategies,
+                BASIC_STRATEGIES + 'ChangeRequestBuildStrategyImpl')
+            ignore = options.get('ignore-target-only-changes', False)
+            XML.SubElement(
+                xml_strategy,
+                'ignoreTargetOnlyChanges').text = bool_text(ignore)
+        elif name == 'tags':
+            xml_strategy = XML.SubElement(
+                strategies, BASIC_STRATEGIES + 'TagBuildStrategyImpl')
+            XML.SubElement(xml_strategy, 'atLeastMillis').text = \
+                _tag_age_millis(options, 'ignore-tags-newer-than')
+            XML.SubElement(xml_strategy, 'atMostMillis').text = \
+                _tag_age_millis(options, 'ignore-tags-older-than')
+        else:
+            raise ValueError('unknown build strategy {0}'.format(name))
+
+
+class ComputedFolder(jenkins_jobs.modules.base.Base):
+
+    """
+    Common parts of multibranch projects and organization folders.
+    Subclasses add their sources in ``sources_xml(xml_parent, data)``.
+    """
+    sequence = 0
+    project_type = None
+    jenkins_class = None
+    view_holder_class = None
+
+    def root_xml(self, data):
+        """
+        Called after data is parsed.
+        Returns xml representing a job
+        :arg dict data: the YAML data structure
+        """
+        started = metrics.start()
+        xml_parent = XML.Element(self.jenkins_class)
+
+        properties = XML.SubElement(xml_parent, 'properties')
+        folders.folder_properties(self.registry, properties, data)
+
+        views = XML.SubElement(xml_parent, 'folderViews',
+                               attrib={'class': self.view_holder_class})
+        _owner(views, self.jenkins_class)
+
+        xml_metrics = XML.SubElement(xml_parent, 'healthMetrics')
+        for health_metric in data.get('health-metrics', []):
+            if health_metric in folders.SUPPORTED_METRICS:
+                XML.SubElement(xml_metrics,
+                               folders.SUPPORTED_METRICS[health_metric])
+
+        icon = XML.SubElement(
+            xml_parent, 'icon',
+            attrib={'class': 'jenkins.branch.MetadataActionFolderIcon'})
+        _owner(icon, self.jenkins_class)
+
+        orphaned_item_strategy(xml_parent,
+                               data.get('orphaned-item-strategy', {}))
+
+        triggers = XML.SubElement(xml_parent, 'triggers')
+        interval = data.get('periodic-folder-trigger')
+        if interval:
+            periodic_folder_trigger(triggers, interval)
+
+        self.sources_xml(xml_parent, data)
+        metrics.ITEMS_GENERATED.inc(type=self.project_type)
+        metrics.GENERATE_SECONDS.observe_since(started, stage='root')
+        return xml_parent
+
+
+class Multibranch(ComputedFolder):
+
+    """
+    Class built off :ref:`Base`
+    """
+    project_type = 'multibranch'
+    jenkins_class = MULTIBRANCH_CLASS
+    view_holder_class = 'jenkins.branch.MultiBranchProjectViewHolder'
+
+    def sources_xml(self, xml_parent, data):
+        sources = XML.SubElement(
+            xml_parent, 'sources',
+            attrib={'class': 'jenkins.branch.MultiBranchProject$'
+                             'BranchSourceList'})
+        sources_data = XML.SubElement(sources, 'data')
+        for scm in data.get('scm', []):
+            if list(scm.keys()) != ['git']:
+                raise ValueError('only git branch sources are supported')
+            git = scm['git']
+            remote = git.get('remote')
+            if not remote:
+                raise ValueError('git branch sources need a remote')
+            branch_source = XML.SubElement(sources_data,
+                                           'jenkins.branch.BranchSource')
+            source = XML.SubElement(
+                branch_source, 'source',
+                attrib={'class': folders.GIT_SOURCE_CLASS})
+            XML.SubElement(source, 'id').text = git.get('id', remote)
+            XML.SubElement(source, 'remote').text = remote
+            credentials_id = git.get('credentials-id')
+            if credentials_id:
+                XML.SubElement(source, 'credentialsId').text = credentials_id
+            traits = XML.SubElement(source, 'traits')
+            XML.SubElement(traits, folders.BRANCH_DISCOVERY_TRAIT)
+            if 'build-strategies' in data:
+                build_strategies(branch_source, data['build-strategies'])
+            strategy = XML.SubElement(
+                branch_source, 'strategy',
+                attrib={'class': 'jenkins.branch.'
+                                 'DefaultBranchPropertyStrategy'})
+            XML.SubElement(strategy, 'properties',
+                           attrib={'class': 'empty-list'})
+        _owner(sources, self.jenkins_class)
+
+        factory = XML.SubElement(
+            xml_parent, 'factory',
+            attrib={'class': 'org.jenkinsci.plugins.workflow.multibranch.'
+                             'WorkflowBranchProjectFactory'})
+        _owner(factory, self.jenkins_class)
+        XML.SubElement(factory, 'scriptPath').text = data.get(
+            'script-path', 'Jenkinsfile')
+
+
+class OrganizationFolder(ComputedFolder):
+
+    """
+    Class built off :ref:`Base`
+    """
+    project_type = 'organization-folder'
+    jenkins_class = ORGANIZATION_CLASS
+    view_holder_class = 'jenkins.branch.OrganizationFolderViewHolder'
+
+    def sources_xml(self, xml_parent, data):
+        navigators = XML.SubElement(xml_parent, 'navigators')
+        github = data.get('github')
+        if not github or not github.get('repo-owner'):
+            raise ValueError('organization folders need a github repo-owner')
+        navigator = XML.SubElement(navigators, GITHUB_NAVIGATOR_CLASS)
+        XML.SubElement(navigator, 'repoOwner').text = github['repo-owner']
+        credentials_id = github.get('credentials-id')
+        if credentials_id:
+            XML.SubElement(navigator, 'credentialsId').text = credentials_id
+        api_uri = github.get('api-uri')
+        if api_uri:
+            XML.SubElement(navigator, 'apiUri').text = api_uri
+        traits = XML.SubElement(navigator, 'traits')
+        trait = XML.SubElement(traits, GITHUB_BRANCH_TRAIT)
+        XML.SubElement(trait, 'strategyId').text = '1'
+
+        factories = XML.SubElement(xml_parent, 'projectFactories')
+        factory = XML.SubElement(
+            factories, 'org.jenkinsci.plugins.workflow.multibranch.'
+                       'WorkflowMultiBranchProjectFactory')
+        XML.SubElement(factory, 'scriptPath').text = data.get(
+            'script-path', 'Jenkinsfile')
+
+        if 'build-strategies' in data:
+            build_strategies(xml_parent, data['build-strategies'])
@@ -0,0 +1,215 @@
+"""
+Write generated XML to a directory tree that stays manageable at 100k
+items.
+
+Two layouts are supported:
+
+``hierarchy``
+    Mirrors the folder tree the way ``JENKINS_HOME/jobs`` does, ``a/b``
+    is written to ``a/jobs/b/config.xml``.
+
+``sharded``
+    Spreads items over ``256 ** levels`` directories by the SHA-1 of their
+    full name, ``a/b`` is written to ``5f/5f0c...xml``, so no directory
+    grows beyond a few hundred entries however large the fleet is.
+
+Items are buffered and written in batches, each file through a temporary
+file renamed into place, so readers never see partial files. A
+``manifest.json`` maps every full name to its path and SHA-256, letting
+downstream tools locate any item with a single lookup. Items whose content
+did not change since the manifest was last written are not rewritten.
+
+Example::
+
+    from jenkins_jobs_addons.output import OutputWriter
+
+    with OutputWriter('out', layout='sharded') as writer:
+        for full_name, config_xml in items:
+            writer.write(full_name, config_xml)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from six.moves.urllib import parse as urllib_parse
+
+LAYOUTS = ('hierarchy', 'sharded')
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+DEFAULT_BATCH_SIZE = 256
+
+
+def atomic_write(path, data):
+    """
+    Write ``data`` to ``path`` through a temporary file in the same
+    directory that is renamed over ``path``.
+    """
+    mode = 'wb' if isinstance(data, bytes) else 'w'
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, 0o644)
+        try:
+            os.replace(tmp_path, path)
+        except AttributeError:
+            # Python 2 has no os.replace but rename is atomic on POSIX
+            os.rename(tmp_path, path)
+    except (IOError, OSError):
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def item_path(full_name, layout='hierarchy', levels=1):
+    """
+    Returns the path of ``full_name`` relative to the output directory.
+    """
+    full_name = full_name.strip('/')
+    if layout == 'sharded':
+        digest = hashlib.sha1(full_name.encode('utf-8')).hexdigest()
+        shards = [digest[2 * level:2 * level + 2] for level in range(levels)]
+        return os.path.join(*(shards + [digest + '.xml']))
+    if layout == 'hierarchy':
+        parts = [urllib_parse.quote(part, safe=' ')
+                 for part in full_name.split('/')]
+        segments = parts[:1]
+        for part in parts[1:]:
+            segments.extend(['jobs', part])
+        return os.path.join(*(segments + ['config.xml']))
+    raise ValueError('layout must be one of {0}'.format(list(LAYOUTS)))
+
+
+def load_manifest(directory):
+    """
+    Returns the manifest of ``directory``, an empty one when there is
+    none. ``manifest['items'][full_name]['path']`` locates an item.
+    """
+    path = os.path.join(directory, MANIFEST_NAME)
+    try:
+        with open(path) as source:
+            manifest = json.load(source)
+    except (IOError, OSError):
+        return {'version': MANIFEST_VERSION, 'items': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError('unsupported manifest version {0} in {1}'.format(
+            manifest.get('version'), path))
+    return manifest
+
+
+def locate(directory, full_name, manifest=None):
+    """
+    Returns the absolute path of ``full_name`` in ``directory``, or None
+    when it is not there.
+    """
+    if manifest is None:
+        manifest = load_manifest(directory)
+    entry = manifest['items'].get(full_name.strip('/'))
+    if entry is None:
+        return None
+    return os.path.join(directory, entry['path'])
+
+
+class OutputWriter(object):
+
+    """
+    :arg str directory: Output directory, created when missing.
+    :arg str layout: ``hierarchy`` or ``sharded``.
+    :arg int levels: Directory levels of the sharded layout, each with a
+      fan-out of 256.
+    :arg int batch_size: Number of items buffered before they are written.
+    :arg bool remove_stale: On :meth:`close`, delete the files of items
+      that are in the previous manifest but were not written this time.
+      By default they are kept in the manifest, so several partial runs,
+      one per shard for instance, can write to the same directory.
+    """
+
+    def __init__(self, directory, layout='hierarchy', levels=1,
+                 batch_size=DEFAULT_BATCH_SIZE, remove_stale=False):
+        if layout not in LAYOUTS:
+            raise ValueError('layout must be one of {0}'.format(
+                list(LAYOUTS)))
+        if levels < 1 or batch_size < 1:
+            raise ValueError('levels and batch_size must be at least 1')
+        self.directory = directory
+        self.layout = layout
+        self.levels = levels
+        self.batch_size = batch_size
+        self.remove_stale = remove_stale
+        previous = load_manifest(directory)
+        if previous.get('layout', layout) != layout or \
+                previous.get('levels', levels) != levels:
+            # paths moved, nothing of the previous run can be reused
+            self._previous = {}
+        else:
+            self._previous = previous['items']
+        self.items = {}
+        self.written = 0
+        self.unchanged = 0
+        self._pending = []
+        self._directories = set()
+
+    def write(self, full_name, config_xml):
+        """Queue serialized XML of ``full_name`` for writing."""
+        full_name = full_name.strip('/')
+        self._pending.append((full_name, config_xml))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every queued item."""
+        pending, self._pending = self._pending, []
+        for full_name, config_xml in pending:
+            path = item_path(full_name, self.layout, self.levels)
+            digest = hashlib.sha256(config_xml).hexdigest()
+            self.items[full_name] = {'path': path, 'sha256': digest}
+            absolute = os.path.join(self.directory, path)
+            previous = self._previous.get(full_name)
+            if previous == self.items[full_name] and \
+                    os.path.exists(absolute):
+                self.unchanged += 1
+                continue
+            parent = os.path.dirname(absolute)
+            if parent not in self._directories:
+                if not os.path.isdir(parent):
+                    os.makedirs(parent)
+                self._directories.add(parent)
+            atomic_write(absolute, config_xml)
+            self.written += 1
+
+    def close(self):
+        """
+        Write the remaining items and the manifest. Returns the manifest.
+        """
+        self.flush()
+        items = self.items
+        if self.remove_stale:
+            for full_name, entry in self._previous.items():
+                if full_name in items:
+                    continue
+                try:
+                    os.unlink(os.path.join(self.directory, entry['path']))
+                except OSError:
+                    pass
+        else:
+            items = dict(self._previous)
+            items.update(self.items)
+        manifest = {'version': MANIFEST_VERSION, 'layout': self.layout,
+                    'levels': self.levels, 'items': items}
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        atomic_write(os.path.join(self.directory, MANIFEST_NAME),
+                     json.dumps(manifest, indent=1, sort_keys=True))
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
@@ -0,0 +1,130 @@
+"""
+Plugin version aware output for the folder and view builders.
+
+Older releases of the plugins behind the views and folders do not know
+every field the builders emit. Each builder owns an :class:`Emitter`
+describing the first plugin version that accepts each of its fields.
+
+The installed version is read from the ``plugins_info`` Jenkins Job Builder
+was given, once per run: the set of fields to drop is resolved the first
+time a builder runs with a registry and cached in a dispatch table keyed
+on that registry. Builders look their fields up in that set and never
+create the dropped ones. Without plugin information nothing is dropped.
+
+Dropping a field the user did not ask for is silent. When the field comes
+from an option set in the YAML, a warning is logged once per run since
+the option will have no effect.
+"""
+
+import logging
+import re
+import weakref
+
+import six
+
+logger = logging.getLogger(__name__)
+
+
+def version_tuple(version):
+    """
+    Returns a comparable tuple of the numeric parts of ``version``,
+    ``'1.4.3-SNAPSHOT'`` becomes ``(1, 4, 3)``.
+    """
+    return tuple(int(part) for part in re.findall(r'\d+', str(version)))
+
+
+def plugin_version(registry, names):
+    """
+    Returns the version tuple of the first of ``names`` installed according
+    to ``registry``, or None when it is unknown.
+    """
+    get_plugin_info = getattr(registry, 'get_plugin_info', None)
+    if get_plugin_info is None:
+        return None
+    for name in names:
+        info = get_plugin_info(name) or {}
+        if info.get('version'):
+            return version_tuple(info['version'])
+    return None
+
+
+def _registry(parser):
+    # view builders get the YAML parser, project classes the registry
+    return getattr(parser, 'registry', parser)
+
+
+class Emitter(object):
+
+    """
+    Version variants of one builder.
+
+    :arg tuple plugins: Short names the plugin is or was known under.
+    :arg dict fields: XML tag to the first plugin version accepting it.
+    :arg dict options: XML tag to the YAML option, or tuple of options,
+      setting it.
+    """
+
+    def __init__(self, plugins, fields, options=None):
+        self.plugins = tuple(plugins)
+        self.since = dict(fields)
+        self.fields = dict((tag, version_tuple(version))
+                           for tag, version in fields.items())
+        self.options = dict()
+        for tag, names in (options or {}).items():
+            if isinstance(names, six.string_types):
+                names = (names,)
+            self.options[tag] = tuple(names)
+        self._variants = weakref.WeakKeyDictionary()
+        self._warned = weakref.WeakKeyDictionary()
+
+    def unsupported(self, parser):
+        """
+        Returns the set of tags the installed plugin does not accept,
+        resolved once per registry.
+        """
+        registry = _registry(parser)
+        if registry is None:
+            return frozenset()
+        try:
+            return self._variants[registry]
+        except (KeyError, TypeError):
+            pass
+        version = plugin_version(registry, self.plugins)
+        if version is None:
+            variant = frozenset()
+        else:
+            variant = frozenset(tag for tag, since in self.fields.items()
+                                if version < since)
+        try:
+            self._variants[registry] = variant
+        except TypeError:
+            # registry cannot be weakly referenced, resolve every time
+            pass
+        return variant
+
+    def warn(self, parser, requested):
+        """
+        Log a warning for the options in ``requested`` that only set
+        fields the installed plugin rejects, once per registry and field.
+
+        :arg requested: Names of the YAML options the user set, usually
+          the data dictionary of the builder.
+        """
+        unsupported = self.unsupported(parser)
+        if unsupported and requested:
+            self._warn(_registry(parser), unsupported, set(requested))
+
+    def _warn(self, registry, dropped, requested):
+        try:
+            warned = self._warned.setdefault(registry, set())
+        except TypeError:
+            warned = set()
+        for tag in sorted(dropped - warned):
+            names = [name for name in self.options.get(tag, ())
+                     if name in requested]
+            if not names:
+                continue
+            warned.add(tag)
+            logger.warning('%s is ignored, it needs the %s plugin %s or '
+                           'later', names[0], self.plugins[0],
+                           self.since[tag])
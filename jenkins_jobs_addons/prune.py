@@ -0,0 +1,231 @@
+"""
+Prune folders and views that are no longer generated from YAML.
+
+The generated folders are kept as an indexed set of full names, together
+with the view names of each folder. Whatever a remote
+:class:`jenkins_jobs_addons.snapshot.Snapshot` holds beyond that set, within
+the managed top-level folders, is an orphan.
+
+Orphans are deleted bottom-up: views of surviving folders first, then
+folders level by level starting with the deepest one. Each level is
+deleted by a bounded number of worker threads and a folder is skipped when
+any of its orphaned descendants could not be deleted.
+
+Deletions are refused altogether when they would exceed ``max_deletions``,
+and a dry run reports what would be deleted without touching Jenkins.
+
+Example::
+
+    from jenkins_jobs_addons import prune
+
+    plan = prune.plan_prune(snapshot, {'team': ['All'], 'team/api': []})
+    print(prune.execute_prune(client, plan, dry_run=True).format())
+"""
+
+import threading
+
+from six.moves import queue
+
+from jenkins_jobs_addons import metrics
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_DELETIONS = 50
+
+
+class PruneError(Exception):
+
+    """
+    Raised when a prune would delete more than allowed.
+    """
+
+
+class GeneratedIndex(object):
+
+    """
+    Indexed set of the generated folders and their views.
+
+    :arg dict generated: Full name of every generated folder to the list of
+      its view names, or None when its views are not managed.
+    """
+
+    def __init__(self, generated):
+        self.views = dict()
+        for name, views in generated.items():
+            self.views[name.strip('/')] = \
+                frozenset(views) if views is not None else None
+        self.folders = frozenset(self.views)
+        self.top_level = frozenset(n.split('/', 1)[0] for n in self.folders)
+
+    def __contains__(self, full_name):
+        return full_name in self.folders
+
+
+class PrunePlan(object):
+
+    """
+    Orphans to delete: ``views`` as ``(folder, view)`` pairs and
+    ``folders`` deepest first.
+    """
+
+    def __init__(self, folders, views):
+        self.folders = folders
+        self.views = views
+
+    def __len__(self):
+        return len(self.folders) + len(self.views)
+
+
+def plan_prune(snapshot, generated, scope=None):
+    """
+    Compare ``generated`` against ``snapshot``.
+
+    :arg snapshot: Remote :class:`jenkins_jobs_addons.snapshot.Snapshot`.
+    :arg generated: A :class:`GeneratedIndex` or the dictionary to build
+      one from.
+    :arg set scope: Top-level names that may be pruned, defaults to the
+      generated top-level folders.
+    """
+    if not isinstance(generated, GeneratedIndex):
+        generated = GeneratedIndex(generated)
+    if scope is None:
+        scope = generated.top_level
+
+    folders = [name for name in snapshot.folders()
+               if name not in generated and name.split('/', 1)[0] in scope]
+    # children of multibranch projects and organization folders belong
+    # to Jenkins, not to the YAML
+    folders = [name for name in folders if not snapshot.computed(name)]
+    folders.sort(key=lambda name: (-name.count('/'), name))
+
+    views = []
+    for name in sorted(generated.folders):
+        wanted = generated.views[name]
+        if wanted is None or name not in snapshot:
+            continue
+        item = snapshot.items[name]
+        for view in item['views']:
+            # Jenkins refuses to delete the primary view of a folder
+            if view not in wanted and view != item['primary_view']:
+                views.append((name, view))
+    return PrunePlan(folders, views)
+
+
+class PruneReport(object):
+
+    def __init__(self, plan, dry_run):
+        self.plan = plan
+        self.dry_run = dry_run
+        self.deleted = []
+        self.failed = []
+        self.skipped = []
+
+    def format(self):
+        """Returns a human readable summary, one line per orphan."""
+        if self.dry_run:
+            lines = ['would delete view {1} of {0}'.format(*item)
+                     for item in self.plan.views]
+            lines.extend('would delete folder {0}'.format(name)
+                         for name in self.plan.folders)
+        else:
+            lines = ['deleted {0}'.format(item) for item in self.deleted]
+            lines.extend('failed {0}: {1}'.format(item, error)
+                         for item, error in self.failed)
+            lines.extend('skipped {0}'.format(item) for item in self.skipped)
+        return '\n'.join(lines)
+
+
+def _run_bounded(func, items, workers):
+    """
+    Call ``func`` on every item with at most ``workers`` threads.
+    Returns the list of ``(item, exception)`` failures.
+    """
+    pending = queue.Queue()
+    for item in items:
+        pending.put(item)
+    failures = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                item = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func(item)
+            except Exception as e:
+                with lock:
+                    failures.append((item, e))
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(workers, len(items)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return failures
+
+
+def execute_prune(client, plan, workers=DEFAULT_WORKERS,
+                  max_deletions=DEFAULT_MAX_DELETIONS, dry_run=False):
+    """
+    Delete the orphans of ``plan``.
+
+    :arg client: A :class:`jenkins_jobs_addons.remote.JenkinsClient`.
+    :arg PrunePlan plan: What to delete.
+    :arg int workers: Maximum concurrent delete requests.
+    :arg int max_deletions: Refuse to prune more than this many items.
+    :arg bool dry_run: Only report what would be deleted.
+
+    Returns a :class:`PruneReport`.
+    """
+    if len(plan) > max_deletions:
+        raise PruneError('refusing to delete {0} items, the limit is '
+                         '{1}'.format(len(plan), max_deletions))
+    report = PruneReport(plan, dry_run)
+    if dry_run:
+        return report
+
+    def delete_view(item):
+        client.delete_view(*item)
+
+    failures = _run_bounded(delete_view, plan.views, workers)
+    failed_views = set(item for item, _ in failures)
+    report.failed.extend(('view {1} of {0}'.format(*item), error)
+                         for item, error in failures)
+    report.deleted.extend('view {1} of {0}'.format(*item)
+                          for item in plan.views if item not in failed_views)
+
+    blocked = set()
+    skipped = set()
+    levels = dict()
+    for name in plan.folders:
+        levels.setdefault(name.count('/'), []).append(name)
+    for level in sorted(levels, reverse=True):
+        runnable = []
+        for name in levels[level]:
+            if name in blocked:
+                skipped.add(name)
+                report.skipped.append('folder ' + name)
+            else:
+                runnable.append(name)
+        failures = _run_bounded(client.delete_item, runnable, workers)
+        failed = set(name for name, _ in failures)
+        report.failed.extend(('folder ' + name, error)
+                             for name, error in failures)
+        report.deleted.extend('folder ' + name
+                              for name in runnable if name not in failed)
+        for name in failed | skipped:
+            parent = name.rpartition('/')[0]
+            while parent:
+                blocked.add(parent)
+                parent = parent.rpartition('/')[0]
+
+    outcomes = [('deleted', report.deleted),
+                ('failed', [item for item, _ in report.failed]),
+                ('skipped', report.skipped)]
+    for outcome, items in outcomes:
+        for item in items:
+            # items read "folder <name>" or "view <view> of <folder>"
+            metrics.PRUNED.inc(kind=item.split(' ', 1)[0], outcome=outcome)
+    return report
@@ -0,0 +1,148 @@
+"""
+Minimal Jenkins HTTP client used by the snapshot and sync helpers.
+
+Only the calls needed to inspect and update folders and views are
+implemented. Authenticate with a user name and API token; Jenkins does not
+ask for a CSRF crumb for token authenticated requests.
+
+Example::
+
+    from jenkins_jobs_addons.remote import JenkinsClient
+
+    client = JenkinsClient('https://jenkins.example.com', 'bot', 'token')
+    client.create_item('team/service', config_xml)
+"""
+
+import base64
+import json
+import threading
+
+from six.moves.urllib import error as urllib_error
+from six.moves.urllib import parse as urllib_parse
+from six.moves.urllib import request as urllib_request
+
+
+class JenkinsError(Exception):
+
+    """
+    Raised when Jenkins answers a request with an error status.
+    """
+
+    def __init__(self, method, url, status, reason=''):
+        super(JenkinsError, self).__init__(
+            '{0} {1} failed with {2} {3}'.format(method, url, status, reason))
+        self.method = method
+        self.url = url
+        self.status = status
+
+
+def item_path(full_name):
+    """
+    Returns the URL path of an item, ``a/b`` becomes ``/job/a/job/b``.
+    The root is the empty string.
+    """
+    if not full_name:
+        return ''
+    return ''.join('/job/' + urllib_parse.quote(part, safe='')
+                   for part in full_name.strip('/').split('/'))
+
+
+def split_name(full_name):
+    """Returns the parent full name and the leaf name of an item."""
+    parent, _, name = full_name.strip('/').rpartition('/')
+    return parent, name
+
+
+class JenkinsClient(object):
+
+    """
+    :arg str url: Base URL of the Jenkins controller.
+    :arg str user: User name, optional.
+    :arg str password: API token of ``user``.
+    :arg int timeout: Socket timeout in seconds.
+    """
+
+    def __init__(self, url, user=None, password=None, timeout=30):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.headers = {}
+        if user is not None:
+            token = '{0}:{1}'.format(user, password).encode('utf-8')
+            self.headers['Authorization'] = 'Basic ' + \
+                base64.b64encode(token).decode('ascii')
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def request(self, method, path, query=None, data=None,
+                content_type=None):
+        """
+        Send a request and return the response body.
+        Raises :class:`JenkinsError` on HTTP errors.
+        """
+        url = self.url + path
+        if query:
+            url += '?' + urllib_parse.urlencode(query)
+        req = urllib_request.Request(url, data=data)
+        req.get_method = lambda: method
+        for header, value in self.headers.items():
+            req.add_header(header, value)
+        if content_type:
+            req.add_header('Content-Type', content_type)
+        with self._lock:
+            self.requests += 1
+        try:
+            response = urllib_request.urlopen(req, timeout=self.timeout)
+            try:
+                return response.read()
+            finally:
+                response.close()
+        except urllib_error.HTTPError as e:
+            raise JenkinsError(method, url, e.code, e.reason)
+
+    def get_json(self, path, query=None):
+        body = self.request('GET', path + '/api/json', query=query)
+        return json.loads(body.decode('utf-8'))
+
+    def create_item(self, full_name, config_xml):
+        parent, name = split_name(full_name)
+        self.request('POST', item_path(parent) + '/createItem',
+                     query={'name': name}, data=config_xml,
+                     content_type='application/xml')
+
+    def update_item(self, full_name, config_xml):
+        self.request('POST', item_path(full_name) + '/config.xml',
+                     data=config_xml, content_type='application/xml')
+
+    def delete_item(self, full_name):
+        self.request('POST', item_path(full_name) + '/doDelete', data=b'')
+
+    def delete_view(self, full_name, view_name):
+        """Delete view ``view_name`` of folder ``full_name``."""
+        path = '{0}/view/{1}/doDelete'.format(
+            item_path(full_name), urllib_parse.quote(view_name, safe=''))
+        self.request('POST', path, data=b'')
+
+    def rename_item(self, full_name, new_name):
+        """Rename an item within its parent folder."""
+        self.request('POST', item_path(full_name) + '/confirmRename',
+                     query={'newName': new_name}, data=b'')
+
+    def move_item(self, full_name, destination):
+        """Move an item into the folder ``destination``, '' for the root."""
+        body = urllib_parse.urlencode({'destination': '/' + destination})
+        self.request('POST', item_path(full_name) + '/move/move',
+                     data=body.encode('utf-8'),
+                     content_type='application/x-www-form-urlencoded')
+
+    def relocate(self, full_name, new_full_name):
+        """
+        Give an item a new full name with a move and, if the leaf name
+        changes too, a rename.
+        """
+        parent, name = split_name(full_name)
+        new_parent, new_name = split_name(new_full_name)
+        if parent != new_parent:
+            self.move_item(full_name, new_parent)
+            full_name = new_parent + '/' + name if new_parent else name
+        if name != new_name:
+            self.rename_item(full_name, new_name)
@@ -0,0 +1,178 @@
+"""
+Split folder trees into shards that separate ``jenkins-jobs`` workers can
+generate and upload in parallel.
+
+Definitions are grouped by their top-level folder, the first component of
+the job name, so every parent folder lands in the same shard as its
+children. Groups are then assigned to shards largest first, each going to
+the currently lightest shard. A group weighs as much as the sum of its item
+costs: measured generation times when ``costs`` are given, otherwise one
+per item.
+
+The plan is returned as a manifest that can be written to disk, handed to
+the workers and checked against what they actually produced.
+
+Example::
+
+    from jenkins_jobs_addons import sharding
+
+    manifest = sharding.plan_shards(definitions, 4)
+    sharding.write_manifest(manifest, 'shards.json')
+
+    # on worker 2
+    mine = sharding.select_shard(definitions, manifest, 2)
+
+    # afterwards
+    report = sharding.verify_manifest(manifest, produced_by_shard)
+"""
+
+import heapq
+import json
+import time
+
+MANIFEST_VERSION = 1
+
+
+def definition_name(definition):
+    """
+    Return the full name of a definition, accepting both the bare job
+    dictionary and the ``{'job': {...}}`` form found in YAML files.
+    """
+    if 'name' not in definition and len(definition) == 1:
+        definition = list(definition.values())[0]
+    name = definition.get('name')
+    if not name:
+        raise ValueError('definition has no name: {0}'.format(definition))
+    return name.strip('/')
+
+
+def top_level(name):
+    return name.split('/', 1)[0]
+
+
+def depth(name):
+    return name.count('/')
+
+
+def measure_costs(definitions, generate):
+    """
+    Time ``generate(definition)`` for every definition and return a
+    dictionary of item name to seconds, suitable for :func:`plan_shards`.
+    """
+    costs = dict()
+    for definition in definitions:
+        start = time.time()
+        generate(definition)
+        costs[definition_name(definition)] = time.time() - start
+    return costs
+
+
+def plan_shards(definitions, shards, costs=None):
+    """
+    Partition ``definitions`` into ``shards`` balanced shards.
+
+    :arg list definitions: Folder and job definitions.
+    :arg int shards: Number of shards to produce.
+    :arg dict costs: Optional measured cost per item name. Items without a
+      measurement are weighted with the mean of the measured ones.
+
+    Returns the manifest as a dictionary. Items within a shard are listed
+    parents first.
+    """
+    if shards < 1:
+        raise ValueError('shards must be at least 1')
+    costs = costs or dict()
+    default_cost = 1.0
+    if costs:
+        default_cost = sum(costs.values()) / float(len(costs))
+
+    groups = dict()
+    seen = set()
+    for definition in definitions:
+        name = definition_name(definition)
+        if name in seen:
+            raise ValueError('duplicate definition {0}'.format(name))
+        seen.add(name)
+        group = groups.setdefault(top_level(name), [0.0, []])
+        group[0] += costs.get(name, default_cost)
+        group[1].append(name)
+
+    ordered = sorted(groups.items(), key=lambda g: (-g[1][0], g[0]))
+    loads = [(0.0, index) for index in range(shards)]
+    manifest_shards = [{'index': index, 'weight': 0.0, 'groups': [],
+                        'items': []} for index in range(shards)]
+    for group_name, (weight, names) in ordered:
+        load, index = heapq.heappop(loads)
+        shard = manifest_shards[index]
+        shard['weight'] += weight
+        shard['groups'].append(group_name)
+        shard['items'].extend(names)
+        heapq.heappush(loads, (load + weight, index))
+
+    for shard in manifest_shards:
+        shard['groups'].sort()
+        shard['items'].sort(key=lambda name: (depth(name), name))
+
+    return {
+        'version': MANIFEST_VERSION,
+        'total': len(seen),
+        'shards': manifest_shards,
+    }
+
+
+def select_shard(definitions, manifest, index):
+    """
+    Return the definitions belonging to shard ``index`` of ``manifest``,
+    parents first.
+    """
+    shard = manifest['shards'][index]
+    groups = set(shard['groups'])
+    selected = [d for d in definitions
+                if top_level(definition_name(d)) in groups]
+    selected.sort(key=lambda d: (depth(definition_name(d)),
+                                 definition_name(d)))
+    return selected
+
+
+def verify_manifest(manifest, produced):
+    """
+    Compare what the workers produced against ``manifest``.
+
+    :arg dict produced: Shard index to an iterable of item names that shard
+      generated or uploaded.
+
+    Returns a dictionary with sorted ``missing``, ``duplicates`` and
+    ``unexpected`` item names, all empty when the run was complete.
+    """
+    expected = dict()
+    for shard in manifest['shards']:
+        for name in shard['items']:
+            expected[name] = shard['index']
+
+    counts = dict()
+    unexpected = set()
+    for index, names in produced.items():
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+            if expected.get(name) != int(index):
+                unexpected.add(name)
+
+    return {
+        'missing': sorted(set(expected) - set(counts)),
+        'duplicates': sorted(n for n, count in counts.items() if count > 1),
+        'unexpected': sorted(unexpected),
+    }
+
+
+def write_manifest(manifest, path):
+    with open(path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+
+def read_manifest(path):
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError('unsupported shard manifest version {0}'.format(
+            manifest.get('version')))
+    return manifest
@@ -0,0 +1,356 @@
+"""
+Snapshot of the folders and views that exist on a Jenkins controller.
+
+Instead of requesting the configuration of every folder, the whole
+inventory is pulled with a handful of ``tree`` API calls. Each call asks
+for ``depth`` nested levels of items at once and pages through the top
+level with the ``{start,end}`` range syntax. Folders of the deepest
+requested level that have children are fetched with further paged calls
+of their own.
+
+The snapshot indexes items by full name and can be saved to and loaded
+from a local JSON file, so a sync can be planned from it without talking
+to Jenkins again. See :func:`plan_sync`.
+
+Multibranch projects and organization folders create and delete their
+children on their own. The snapshot does not descend into them and
+neither the sync nor the prune ever deletes what they contain.
+
+Folders whose path changed are recognised by fingerprinting their
+contents, so the sync moves or renames them instead of deleting and
+recreating them. Fingerprints are matched through a dictionary, keeping
+detection linear in the number of created and deleted folders.
+
+Example::
+
+    from jenkins_jobs_addons.remote import JenkinsClient
+    from jenkins_jobs_addons.snapshot import Snapshot, plan_sync
+
+    snapshot = Snapshot.fetch(JenkinsClient('https://jenkins.example.com'))
+    snapshot.save('inventory.json')
+    plan = plan_sync(snapshot, desired)
+"""
+
+import hashlib
+import json
+
+from jenkins_jobs_addons.remote import item_path
+
+SNAPSHOT_VERSION = 1
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_DEPTH = 3
+COMPUTED_FOLDER_CLASSES = frozenset([
+    'jenkins.branch.OrganizationFolder',
+    'org.jenkinsci.plugins.workflow.multibranch.WorkflowMultiBranchProject',
+])
+FOLDER_CLASSES = COMPUTED_FOLDER_CLASSES | frozenset([
+    'com.cloudbees.hudson.plugins.folder.Folder',
+])
+ITEM_FIELDS = 'name,_class,primaryView[name],views[name]'
+
+
+def tree_query(depth, page=None):
+    """
+    Returns the ``tree`` parameter requesting ``depth`` levels of items,
+    optionally limited to the ``(start, end)`` page of the top level.
+    Items of the deepest level only report whether they have children.
+    """
+    query = ITEM_FIELDS + ',jobs[name]{0,1}'
+    for _ in range(depth - 1):
+        query = '{0},jobs[{1}]'.format(ITEM_FIELDS, query)
+    query = 'jobs[{0}]'.format(query)
+    if page is not None:
+        query += '{{{0},{1}}}'.format(*page)
+    return query
+
+
+class Snapshot(object):
+
+    """
+    Indexed inventory of remote items.
+
+    ``items`` maps the full name of every item to a dictionary with its
+    ``class``, the sorted names of its ``views`` and its ``primary_view``.
+    The root of the controller is stored under the empty name.
+    """
+
+    def __init__(self, items=None):
+        self.items = items if items is not None else dict()
+        self._children = None
+
+    @classmethod
+    def fetch(cls, client, root='', depth=DEFAULT_DEPTH,
+              page_size=DEFAULT_PAGE_SIZE):
+        """
+        Build a snapshot of ``root`` and everything below it.
+
+        :arg client: A :class:`jenkins_jobs_addons.remote.JenkinsClient`.
+        :arg str root: Full name of the folder to start from.
+        :arg int depth: Levels of items requested per call.
+        :arg int page_size: Top-level items requested per call.
+        """
+        if depth < 1 or page_size < 1:
+            raise ValueError('depth and page_size must be at least 1')
+        snapshot = cls()
+        root = root.strip('/')
+        pending = [root]
+        while pending:
+            folder = pending.pop()
+            start = 0
+            while True:
+                page = (start, start + page_size)
+                data = client.get_json(item_path(folder), query={
+                    'tree': ITEM_FIELDS + ',' + tree_query(depth, page)})
+                if start == 0:
+                    snapshot._add(folder, data)
+                jobs = data.get('jobs') or []
+                for job in jobs:
+                    pending.extend(snapshot._walk(folder, job, depth))
+                if len(jobs) < page_size:
+                    break
+                start += page_size
+        return snapshot
+
+    def _add(self, full_name, data):
+        primary = data.get('primaryView') or {}
+        self.items[full_name] = {
+            'class': data.get('_class'),
+            'views': sorted(v['name'] for v in data.get('views') or []),
+            'primary_view': primary.get('name'),
+        }
+        self._children = None
+
+    def _walk(self, parent, data, depth):
+        """
+        Index ``data`` and its nested jobs, returning the folders whose
+        children were not included in the response.
+        """
+        full_name = data['name'] if not parent else \
+            parent + '/' + data['name']
+        self._add(full_name, data)
+        if data.get('_class') in COMPUTED_FOLDER_CLASSES:
+            return []
+        jobs = data.get('jobs') or []
+        if depth <= 1:
+            return [full_name] if jobs else []
+        unfetched = []
+        for job in jobs:
+            unfetched.extend(self._walk(full_name, job, depth - 1))
+        return unfetched
+
+    def children(self, full_name):
+        """Returns the sorted full names of the direct children of an item."""
+        if self._children is None:
+            self._children = dict()
+            for name in self.items:
+                if name:
+                    parent = name.rpartition('/')[0]
+                    self._children.setdefault(parent, []).append(name)
+            for names in self._children.values():
+                names.sort()
+        return self._children.get(full_name, [])
+
+    def computed(self, full_name):
+        """
+        Returns True when ``full_name`` is inside a multibranch project or
+        organization folder, which manages its children itself.
+        """
+        parent = full_name.rpartition('/')[0]
+        while parent:
+            item = self.items.get(parent)
+            if item is not None and item['class'] in COMPUTED_FOLDER_CLASSES:
+                return True
+            parent = parent.rpartition('/')[0]
+        return False
+
+    def folders(self):
+        """Returns the set of full names of folder-like items."""
+        return set(name for name, item in self.items.items()
+                   if name and item['class'] in FOLDER_CLASSES)
+
+    def views(self):
+        """Returns the set of ``(folder full name, view name)`` pairs."""
+        return set((name, view) for name, item in self.items.items()
+                   for view in item['views'])
+
+    def __contains__(self, full_name):
+        return full_name in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def save(self, path):
+        with open(path, 'w') as snapshot_file:
+            json.dump({'version': SNAPSHOT_VERSION, 'items': self.items},
+                      snapshot_file, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as snapshot_file:
+            data = json.load(snapshot_file)
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise ValueError('unsupported snapshot version {0}'.format(
+                data.get('version')))
+        return cls(data['items'])
+
+
+class SyncPlan(object):
+
+    """
+    Changes needed to turn the remote state into the desired one.
+
+    ``create`` lists items parents first, ``delete`` lists them children
+    first and ``update`` lists items that exist on both sides once
+    ``moves`` are done. ``moves`` holds ``(old, new)`` full names of folders
+    that were renamed or moved; their children travel with them. Views are
+    part of their folder's configuration, ``view_changes`` maps a folder
+    to the ``(added, removed)`` view names its update brings.
+    """
+
+    def __init__(self, create, update, delete, view_changes, moves=None):
+        self.create = create
+        self.update = update
+        self.delete = delete
+        self.view_changes = view_changes
+        self.moves = moves or []
+
+    def operations(self):
+        """
+        Returns ``(action, args)`` tuples in an order that can be applied
+        as is: creates and moves parents first, then updates, then deletes.
+        """
+        operations = [('create', (name,)) for name in self.create]
+        operations.extend(('move', move) for move in self.moves)
+        operations.sort(key=lambda op: _depth_key(op[1][-1]))
+        operations.extend(('update', (name,)) for name in self.update)
+        operations.extend(('delete', (name,)) for name in self.delete)
+        return operations
+
+    def __repr__(self):
+        return '<SyncPlan create={0} move={1} update={2} delete={3}>'.format(
+            len(self.create), len(self.moves), len(self.update),
+            len(self.delete))
+
+
+def _depth_key(name):
+    return (name.count('/'), name)
+
+
+def fingerprint(children, views, primary_view):
+    """
+    Returns a digest of a folder's contents: the leaf names of its
+    children, its view names and its primary view. Folders without any
+    contents have no fingerprint.
+    """
+    if not children and not views and not primary_view:
+        return None
+    digest = hashlib.sha1()
+    for part in (sorted(children), sorted(views), [primary_view or '']):
+        digest.update('\x00'.join(part).encode('utf-8'))
+        digest.update(b'\x01')
+    return digest.hexdigest()
+
+
+def _unique_fingerprints(names, fingerprint_of):
+    found = dict()
+    for name in names:
+        print_ = fingerprint_of(name)
+        if print_ is not None:
+            found.setdefault(print_, []).append(name)
+    return dict((print_, names[0]) for print_, names in found.items()
+                if len(names) == 1)
+
+
+def plan_sync(snapshot, desired, scope=None, detect_moves=True):
+    """
+    Plan a sync of ``desired`` against ``snapshot``.
+
+    :arg Snapshot snapshot: Remote state.
+    :arg dict desired: Full name of every generated item to the list of
+      its view names, or to a dictionary with ``views`` and
+      ``primary-view``.
+    :arg set scope: Top-level names whose remote descendants may be
+      deleted. Defaults to the top-level folders present in ``desired``;
+      nothing outside of it, nor inside a multibranch project or an
+      organization folder, is ever deleted.
+    :arg bool detect_moves: Turn a delete and a create of folders with the
+      same fingerprint, see :func:`fingerprint`, into a rename or move so
+      the folder keeps its history. Remote top-level folders outside of
+      ``scope`` are candidates too, so renaming a top-level folder moves
+      it; unmatched, they are left alone.
+    """
+    wanted_views = dict()
+    primary_views = dict()
+    for name, spec in desired.items():
+        name = name.strip('/')
+        if isinstance(spec, dict):
+            wanted_views[name] = set(spec.get('views') or [])
+            primary_views[name] = spec.get('primary-view')
+        else:
+            wanted_views[name] = set(spec or [])
+            primary_views[name] = None
+    desired_names = set(wanted_views)
+    if scope is None:
+        scope = set(name.split('/', 1)[0] for name in desired_names)
+    remote_names = set(name for name in snapshot.items
+                       if name and not snapshot.computed(name))
+
+    create = desired_names - remote_names
+    update = desired_names & remote_names
+    delete = set(name for name in remote_names - desired_names
+                 if name.split('/', 1)[0] in scope)
+    moves = []
+    remote_of = dict()
+    # a renamed top-level folder is outside of the default scope
+    vanished = set(name for name in remote_names - desired_names
+                   if '/' not in name and name not in scope)
+
+    if detect_moves and create and (delete or vanished):
+        desired_children = dict()
+        for name in desired_names:
+            parent, _, leaf = name.rpartition('/')
+            desired_children.setdefault(parent, []).append(leaf)
+
+        def remote_fingerprint(name):
+            item = snapshot.items[name]
+            children = [c.rpartition('/')[2] for c in snapshot.children(name)]
+            return fingerprint(children, item['views'], item['primary_view'])
+
+        def desired_fingerprint(name):
+            return fingerprint(desired_children.get(name, []),
+                               wanted_views[name], primary_views[name])
+
+        sources = _unique_fingerprints(delete | vanished, remote_fingerprint)
+        targets = _unique_fingerprints(create, desired_fingerprint)
+        for print_, new in sorted(targets.items(),
+                                  key=lambda t: _depth_key(t[1])):
+            old = sources.get(print_)
+            if old is None or new not in create or \
+                    (old not in delete and old not in vanished):
+                # already travelling with a moved parent
+                continue
+            vanished.discard(old)
+            moves.append((old, new))
+            prefix = old + '/'
+            descendants = [old] + [n for n in remote_names - desired_names
+                                   if n.startswith(prefix)]
+            for remote in descendants:
+                delete.discard(remote)
+                moved = new + remote[len(old):]
+                if moved in desired_names:
+                    create.discard(moved)
+                    update.add(moved)
+                    remote_of[moved] = remote
+                else:
+                    delete.add(moved)
+
+    view_changes = dict()
+    for name in update:
+        existing = set(snapshot.items[remote_of.get(name, name)]['views'])
+        if wanted_views[name] != existing:
+            view_changes[name] = (sorted(wanted_views[name] - existing),
+                                  sorted(existing - wanted_views[name]))
+    return SyncPlan(sorted(create, key=_depth_key),
+                    sorted(update, key=_depth_key),
+                    sorted(delete, key=_depth_key, reverse=True),
+                    view_changes, moves)
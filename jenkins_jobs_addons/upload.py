@@ -0,0 +1,255 @@
+"""
+Overlap XML generation with uploads to Jenkins.
+
+Generating everything before uploading leaves the network idle during
+generation and the CPU idle during uploads. :class:`UploadPipeline` runs
+both at once: the calling thread generates and serializes items into a
+bounded queue that a pool of uploader threads drains. When the uploaders
+fall behind, the queue fills up and generation blocks until there is room
+again, so memory stays bounded however many items there are.
+
+Items are uploaded parents first. An uploader holding an item whose parent
+folder is still being uploaded waits for it, and the item fails without a
+request when its parent failed.
+
+The pipeline uploads the XML Jenkins Job Builder generated with all of its
+modules, serialized the way ``jenkins-jobs update`` does, so both upload
+the same configuration.
+
+Example::
+
+    from jenkins_jobs.xml_config import XmlJobGenerator
+    from jenkins_jobs_addons import upload
+    from jenkins_jobs_addons.remote import JenkinsClient
+
+    xml_jobs = XmlJobGenerator(registry).generateXML(job_data_list)
+    client = JenkinsClient('https://jenkins.example.com', 'bot', 'token')
+    pipeline = upload.UploadPipeline(upload.client_uploader(client))
+    pipeline.run(upload.generate(xml_jobs))
+    print(pipeline.stats())
+"""
+
+import threading
+import time
+
+from jenkins_jobs import xml_config
+from six.moves import queue
+
+from jenkins_jobs_addons import canonical
+from jenkins_jobs_addons import metrics
+from jenkins_jobs_addons import xml_backend as XML
+from jenkins_jobs_addons.remote import JenkinsError
+
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 64
+_STOP = object()
+
+
+def generate(xml_jobs, digests=None):
+    """
+    Lazily yield ``(full name, element)`` pairs for the jobs Jenkins Job
+    Builder generated.
+
+    :arg xml_jobs: :class:`jenkins_jobs.xml_config.XmlJob` objects, as
+      returned by ``XmlJobGenerator.generateXML`` or left in
+      ``YamlParser.xml_jobs`` by older releases, built by every module of
+      the job.
+    :arg dict digests: Full name to the
+      :func:`jenkins_jobs_addons.canonical.digest_of` of the item uploaded
+      last time. Items with an unchanged digest are skipped and the
+      dictionary is updated with the digests of the others, drop the
+      names of failed uploads from it before using it again.
+    """
+    for xml_job in xml_jobs:
+        full_name = xml_job.name.strip('/')
+        if digests is not None:
+            digest = canonical.digest_of(xml_job.xml)
+            if digests.get(full_name) == digest:
+                continue
+            digests[full_name] = digest
+        yield full_name, xml_job.xml
+
+
+def serialize(element):
+    """
+    Returns the bytes ``jenkins-jobs update`` uploads for ``element``.
+    Trees built with lxml, see :func:`jenkins_jobs_addons.xml_backend.owned`,
+    are serialized as they are.
+    """
+    if XML.backend_of(element) is XML.etree:
+        return xml_config.XmlJob(element, '').output()
+    return XML.tostring(element)
+
+
+def client_uploader(client, existing=None):
+    """
+    Returns an upload function for
+    :class:`jenkins_jobs_addons.remote.JenkinsClient`.
+
+    :arg set existing: Full names known to exist, for instance from a
+      :class:`jenkins_jobs_addons.snapshot.Snapshot`. Without it every item
+      is updated first and created when Jenkins does not know it.
+    """
+    def upload(full_name, config_xml):
+        if existing is not None:
+            if full_name in existing:
+                client.update_item(full_name, config_xml)
+            else:
+                client.create_item(full_name, config_xml)
+            return
+        try:
+            client.update_item(full_name, config_xml)
+        except JenkinsError as e:
+            if e.status != 404:
+                raise
+            client.create_item(full_name, config_xml)
+    return upload
+
+
+class StageCounter(object):
+
+    """
+    Items, bytes and busy seconds of one pipeline stage.
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, size=0):
+        with self._lock:
+            self.items += 1
+            self.bytes += size
+            self.seconds += seconds
+
+    def as_dict(self):
+        return {
+            'items': self.items,
+            'bytes': self.bytes,
+            'seconds': self.seconds,
+            'items_per_second':
+                self.items / self.seconds if self.seconds else 0.0,
+        }
+
+
+class UploadPipeline(object):
+
+    """
+    :arg callable upload: Called with the full name and the serialized XML
+      of every item, from several threads at once.
+    :arg int workers: Number of uploader threads.
+    :arg int queue_size: Maximum number of generated items waiting for an
+      uploader.
+    """
+
+    def __init__(self, upload, workers=DEFAULT_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        if workers < 1 or queue_size < 1:
+            raise ValueError('workers and queue_size must be at least 1')
+        self.upload = upload
+        self.workers = workers
+        self.queue_size = queue_size
+        self.generated = StageCounter()
+        self.uploaded = StageCounter()
+        self.backpressure_seconds = 0.0
+        self.max_queue_depth = 0
+        self.failed = []
+        self.elapsed = 0.0
+        self._pending = set()
+        self._failed_names = set()
+        self._condition = threading.Condition()
+
+    def _wait_for_parent(self, full_name):
+        parent = full_name.rpartition('/')[0]
+        with self._condition:
+            while parent in self._pending:
+                self._condition.wait()
+            return parent not in self._failed_names
+
+    def _finish(self, full_name, error):
+        with self._condition:
+            self._pending.discard(full_name)
+            if error is not None:
+                self._failed_names.add(full_name)
+                self.failed.append((full_name, error))
+            self._condition.notify_all()
+
+    def _uploader(self, items):
+        while True:
+            item = items.get()
+            if item is _STOP:
+                return
+            full_name, config_xml = item
+            error = None
+            if not self._wait_for_parent(full_name):
+                error = ValueError('parent of {0} failed'.format(full_name))
+                metrics.UPLOADS.inc(outcome='skipped')
+            else:
+                start = time.time()
+                try:
+                    self.upload(full_name, config_xml)
+                    self.uploaded.add(time.time() - start, len(config_xml))
+                    metrics.UPLOADS.inc(outcome='success')
+                except Exception as e:
+                    error = e
+                    metrics.UPLOADS.inc(outcome='failure')
+                metrics.UPLOAD_SECONDS.observe_since(start)
+            self._finish(full_name, error)
+
+    def run(self, items):
+        """
+        Generate and upload ``items``, an iterable of ``(full name,
+        element)`` pairs that is consumed lazily. Returns the list of
+        ``(full name, exception)`` failures.
+        """
+        started = time.time()
+        pending = queue.Queue(self.queue_size)
+        threads = [threading.Thread(target=self._uploader, args=(pending,))
+                   for _ in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            iterator = iter(items)
+            while True:
+                start = time.time()
+                try:
+                    full_name, element = next(iterator)
+                except StopIteration:
+                    break
+                config_xml = serialize(element)
+                self.generated.add(time.time() - start, len(config_xml))
+                metrics.BYTES_EMITTED.inc(len(config_xml))
+                with self._condition:
+                    self._pending.add(full_name)
+                try:
+                    pending.put_nowait((full_name, config_xml))
+                except queue.Full:
+                    waited = time.time()
+                    pending.put((full_name, config_xml))
+                    self.backpressure_seconds += time.time() - waited
+                self.max_queue_depth = max(self.max_queue_depth,
+                                           pending.qsize())
+        finally:
+            for _ in threads:
+                pending.put(_STOP)
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.time() - started
+        return self.failed
+
+    def stats(self):
+        """Returns the counters of every stage as a dictionary."""
+        return {
+            'generate': self.generated.as_dict(),
+            'upload': self.uploaded.as_dict(),
+            'queue': {
+                'size': self.queue_size,
+                'max_depth': self.max_queue_depth,
+                'backpressure_seconds': self.backpressure_seconds,
+            },
+            'failed': len(self.failed),
+            'elapsed': self.elapsed,
+        }
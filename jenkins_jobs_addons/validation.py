@@ -0,0 +1,647 @@
+"""
+Validate folder and view definitions before anything is generated.
+
+The builders only raise ``ValueError`` on a bad option once generation
+reaches the item, possibly after thousands of others were uploaded, and
+they silently ignore options they do not know. :func:`validate_paths`
+checks every folder, multibranch, organization folder and view option of a
+set of YAML files against a schema up front, one file per worker process,
+and returns every problem found with its file and line. Unknown options
+are reported together with the closest known option.
+
+Values of job templates that still contain ``{placeholders}`` and values
+behind Jenkins Job Builder tags such as ``!include`` are not checked, they
+are only known after expansion. Booleans follow
+:func:`jenkins_jobs_addons.canonical.is_bool`, so ``yes`` and ``on`` are
+accepted like the builders accept them.
+
+Validation is a separate step, ``jenkins-jobs update`` does not run it.
+Run it before generating, for example in CI::
+
+    jjb-addons-validate jobs/ && jenkins-jobs update jobs/
+
+or from Python::
+
+    from jenkins_jobs_addons import validation
+
+    validation.assert_valid(['jobs/'])
+"""
+
+import argparse
+import collections
+import difflib
+import multiprocessing
+import os
+import sys
+
+import six
+import yaml
+
+from jenkins_jobs_addons import canonical
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import multibranch
+from jenkins_jobs_addons import views
+
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+
+class Problem(collections.namedtuple('Problem', 'path line message')):
+
+    """
+    One validation error, ``line`` is None when it is not known.
+    """
+
+    def __str__(self):
+        if self.line is None:
+            return '{0}: {1}'.format(self.path, self.message)
+        return '{0}:{1}: {2}'.format(self.path, self.line, self.message)
+
+
+class ValidationFailed(ValueError):
+
+    """
+    Raised by :func:`assert_valid` with every :class:`Problem` found.
+    """
+
+    def __init__(self, problems):
+        super(ValidationFailed, self).__init__(
+            '\n'.join(str(problem) for problem in problems))
+        self.problems = problems
+
+
+# YAML loading
+
+class _Mapping(dict):
+    line = None
+
+    def __init__(self, *args, **kwargs):
+        super(_Mapping, self).__init__(*args, **kwargs)
+        self.lines = {}
+
+
+class _Sequence(list):
+    line = None
+
+    def __init__(self, *args, **kwargs):
+        super(_Sequence, self).__init__(*args, **kwargs)
+        self.lines = []
+
+
+class _Tagged(object):
+
+    """
+    Value behind a custom tag, unknown until Jenkins Job Builder expands it.
+    """
+
+    def __init__(self, tag):
+        self.tag = tag
+
+
+class _Loader(yaml.SafeLoader):
+    pass
+
+
+def _construct_mapping(loader, node):
+    loader.flatten_mapping(node)
+    mapping = _Mapping()
+    mapping.line = node.start_mark.line + 1
+    for key_node, value_node in node.value:
+        key = loader.construct_object(key_node, deep=True)
+        try:
+            mapping[key] = loader.construct_object(value_node, deep=True)
+        except TypeError:
+            # unhashable key, plain YAML loading fails on it too
+            continue
+        mapping.lines[key] = key_node.start_mark.line + 1
+    return mapping
+
+
+def _construct_sequence(loader, node):
+    sequence = _Sequence()
+    sequence.line = node.start_mark.line + 1
+    for item_node in node.value:
+        sequence.append(loader.construct_object(item_node, deep=True))
+        sequence.lines.append(item_node.start_mark.line + 1)
+    return sequence
+
+
+def _construct_tagged(loader, suffix, node):
+    return _Tagged('!' + suffix)
+
+
+_Loader.add_constructor(yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG,
+                        _construct_mapping)
+_Loader.add_constructor(yaml.resolver.BaseResolver.DEFAULT_SEQUENCE_TAG,
+                        _construct_sequence)
+_Loader.add_multi_constructor('!', _construct_tagged)
+
+
+def load(stream):
+    """
+    Load YAML keeping the line of every mapping key and sequence item.
+    Tags unknown to plain YAML load as placeholders.
+    """
+    return yaml.load(stream, Loader=_Loader)
+
+
+def _line(container, key=None):
+    if isinstance(container, _Mapping):
+        return container.lines.get(key, container.line)
+    if isinstance(container, _Sequence):
+        if key is not None and key < len(container.lines):
+            return container.lines[key]
+        return container.line
+    return None
+
+
+# schema
+
+def _is_template(value):
+    if isinstance(value, _Tagged):
+        return True
+    return isinstance(value, six.string_types) and '{' in value and \
+        '}' in value
+
+
+class Type(object):
+
+    """
+    Option holding a value of a plain type.
+    """
+
+    names = {bool: 'a boolean', int: 'an integer', str: 'a string',
+             list: 'a list', dict: 'a mapping'}
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def accepts(self, value):
+        if self.kind is str:
+            return isinstance(value, six.string_types)
+        if self.kind is int:
+            return isinstance(value, six.integer_types) and \
+                not isinstance(value, bool)
+        if self.kind is bool:
+            return canonical.is_bool(value)
+        return isinstance(value, self.kind)
+
+    def check(self, value, where, line, report):
+        if not self.accepts(value):
+            report(line, '{0} must be {1}, not {2!r}'.format(
+                where, self.names[self.kind], value))
+            return False
+        return True
+
+
+class Integer(Type):
+
+    """
+    Integer option of at least ``minimum``, or one of ``special``.
+    """
+
+    def __init__(self, minimum=None, special=()):
+        super(Integer, self).__init__(int)
+        self.minimum = minimum
+        self.special = special
+
+    def check(self, value, where, line, report):
+        if not super(Integer, self).check(value, where, line, report):
+            return False
+        if value in self.special or self.minimum is None or \
+                value >= self.minimum:
+            return True
+        expected = 'at least {0}'.format(self.minimum)
+        if self.special:
+            expected += ' or one of {0}'.format(list(self.special))
+        report(line, '{0} must be {1}, not {2}'.format(where, expected, value))
+        return False
+
+
+class Choice(object):
+
+    """
+    Option holding one of ``values``.
+    """
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def check(self, value, where, line, report):
+        if value in self.values:
+            return True
+        message = '{0} must be one of {1}, not {2!r}'.format(
+            where, self.values, value)
+        report(line, message + _suggest(value, self.values))
+        return False
+
+
+class ListOf(object):
+
+    """
+    List option whose items all match ``item``.
+    """
+
+    def __init__(self, item):
+        self.item = item
+
+    def check(self, value, where, line, report):
+        if not isinstance(value, list):
+            report(line, '{0} must be a list, not {1!r}'.format(where, value))
+            return False
+        ok = True
+        for index, item in enumerate(value):
+            ok &= _check(self.item, item, '{0}[{1}]'.format(where, index),
+                         _line(value, index) or line, report)
+        return ok
+
+
+class Options(object):
+
+    """
+    Mapping option.
+
+    :arg dict schema: Option name to its specification.
+    :arg tuple required: Options that must be present.
+    :arg bool strict: Report every unknown option. Otherwise only options
+      close to a known one are reported, for mappings shared with other
+      Jenkins Job Builder modules.
+    """
+
+    def __init__(self, schema, required=(), strict=True):
+        self.schema = schema
+        self.required = required
+        self.strict = strict
+
+    def check(self, value, where, line, report):
+        if not isinstance(value, dict):
+            report(line, '{0} must be a mapping, not {1!r}'.format(
+                where, value))
+            return False
+        ok = True
+        for key in self.required:
+            if key not in value:
+                report(line, '{0} is missing {1}'.format(where, key))
+                ok = False
+        for key, item in sorted(value.items(), key=lambda i: str(i[0])):
+            key_line = _line(value, key) or line
+            name = '{0}.{1}'.format(where, key) if where else str(key)
+            if key in self.schema:
+                ok &= _check(self.schema[key], item, name, key_line, report)
+                continue
+            suggestion = _suggest(key, self.schema)
+            if self.strict or suggestion:
+                report(key_line, 'unknown option {0}{1}'.format(
+                    name, suggestion))
+                ok = False
+        return ok
+
+
+class OneOf(object):
+
+    """
+    Single key mapping selecting a variant, like ``{git: {...}}``. Variants
+    in ``bare`` may also be given by name alone.
+    """
+
+    def __init__(self, variants, bare=(), what='type'):
+        self.variants = variants
+        self.bare = bare
+        self.what = what
+
+    def check(self, value, where, line, report):
+        if isinstance(value, six.string_types) and value in self.bare:
+            return True
+        if not isinstance(value, dict) or len(value) != 1:
+            report(line, '{0} must be a mapping with a single {1}, one of '
+                         '{2}'.format(where, self.what, sorted(self.variants)))
+            return False
+        (name, options), = value.items()
+        if name not in self.variants:
+            report(_line(value, name) or line,
+                   'unknown {0} {1} in {2}{3}'.format(
+                       self.what, name, where,
+                       _suggest(name, self.variants)))
+            return False
+        if options is None and name in self.bare:
+            return True
+        return _check(self.variants[name], options,
+                      '{0}.{1}'.format(where, name),
+                      _line(value, name) or line, report)
+
+
+class Unsupported(object):
+
+    """
+    Option the builder ignores, reported whatever its value.
+    """
+
+    def __init__(self, reason):
+        self.reason = reason
+
+    def check(self, value, where, line, report):
+        report(line, '{0} is not supported, {1}'.format(where, self.reason))
+        return False
+
+
+def _suggest(value, known):
+    if not isinstance(value, six.string_types):
+        return ''
+    close = difflib.get_close_matches(value, [str(k) for k in known], 1, 0.8)
+    if close:
+        return ', did you mean {0}?'.format(close[0])
+    return ''
+
+
+def _check(spec, value, where, line, report):
+    if _is_template(value):
+        return True
+    if isinstance(spec, type):
+        spec = Type(spec)
+    return spec.check(value, where, line, report)
+
+
+def _extend(base, extra):
+    schema = dict(base)
+    schema.update(extra)
+    return schema
+
+
+VIEW_OPTIONS = {
+    'filter-executors': bool,
+    'filter-queue': bool,
+    'folder': bool,
+}
+VIEW_SCHEMAS = {
+    'all': Options(VIEW_OPTIONS),
+    'delivery_pipeline': Options(_extend(VIEW_OPTIONS, {
+        'name': str,
+        'components': ListOf(Options({'name': str, 'first-job': str},
+                                     required=('name', 'first-job'))),
+        'number-of-pipelines': Integer(1),
+        'show-aggregated-pipeline': bool,
+        'number-of-columns': Integer(1),
+        'sorting': Choice(views.SORTING_OPTIONS),
+        'show-avatars': bool,
+        'update-interval': Integer(1),
+        'show-changes': bool,
+        'allow-manual-triggers': bool,
+        'show-total-buildtime': bool,
+        'allow-rebuild': bool,
+        'allow-pipeline-start': bool,
+        'show-description': bool,
+        'show-promotions': bool,
+        'css-url': str,
+        'fullscreen-css-url': str,
+        'regexp-first-jobs': ListOf(str),
+    })),
+    'build_pipeline': Options(_extend(VIEW_OPTIONS, {
+        'name': str,
+        'first-job': str,
+        'display-number-of-builds': Integer(1),
+        'build-view-title': str,
+        'console-output-link-style': Choice(
+            views.CONSOLE_OUTPUT_LINK_STYLES),
+        'css-url': str,
+        'trigger-only-latest-job': bool,
+        'always-allow-manual-trigger': bool,
+        'show-pipeline-parameters': bool,
+        'show-pipeline-parameters-in-header': bool,
+        'start-with-parameters': bool,
+        'refresh-frequency': Integer(1),
+        'show-pipeline-definition-in-headers': bool,
+    })),
+}
+VIEWS_SCHEMA = ListOf(OneOf(VIEW_SCHEMAS, what='view type'))
+
+KEEP = Integer(1, special=(-1,))
+GIT_SOURCE = OneOf({'git': Options({'remote': str, 'credentials-id': str},
+                                   required=('remote',))},
+                   what='scm')
+FOLDER_SCHEMA = {
+    'primary-view': str,
+    'health-metrics': ListOf(Choice(folders.SUPPORTED_METRICS)),
+    'libraries': ListOf(Options({
+        'name': str,
+        'default-version': str,
+        'implicit': bool,
+        'allow-version-override': bool,
+        'include-in-changesets': bool,
+        'scm': GIT_SOURCE,
+        'caching': Options({
+            'refresh-minutes': Integer(0),
+            'excluded-versions': ListOf(str),
+        }),
+    }, required=('name', 'scm'))),
+    'build-discarder': Options({
+        'days-to-keep': KEEP,
+        'num-to-keep': KEEP,
+        'artifact-days-to-keep': KEEP,
+        'artifact-num-to-keep': KEEP,
+    }),
+    'views': VIEWS_SCHEMA,
+    'view-defaults': Options(VIEW_SCHEMAS),
+}
+COMPUTED_VIEWS = Unsupported('Jenkins computes the views of multibranch '
+                             'projects and organization folders')
+COMPUTED_FOLDER_SCHEMA = _extend(FOLDER_SCHEMA, {
+    'primary-view': COMPUTED_VIEWS,
+    'views': COMPUTED_VIEWS,
+    'view-defaults': COMPUTED_VIEWS,
+    'periodic-folder-trigger': Choice(sorted(
+        multibranch.SCAN_INTERVALS,
+        key=lambda i: multibranch.SCAN_INTERVALS[i][1])),
+    'orphaned-item-strategy': Options({
+        'prune-dead-branches': bool,
+        'days-to-keep': KEEP,
+        'number-to-keep': KEEP,
+        'abort-builds': bool,
+    }),
+    'build-strategies': ListOf(OneOf({
+        'regular-branches': Options({}),
+        'skip-initial-build': Options({}),
+        'change-requests': Options({'ignore-target-only-changes': bool}),
+        'tags': Options({
+            'ignore-tags-newer-than': Integer(-1),
+            'ignore-tags-older-than': Integer(-1),
+        }),
+    }, bare=('regular-branches', 'skip-initial-build', 'change-requests',
+             'tags'), what='build strategy')),
+    'script-path': str,
+})
+JOB_SCHEMAS = {
+    'folder': Options(FOLDER_SCHEMA, strict=False),
+    'multibranch': Options(_extend(COMPUTED_FOLDER_SCHEMA, {
+        'scm': ListOf(OneOf({'git': Options(
+            {'remote': str, 'credentials-id': str, 'id': str},
+            required=('remote',))}, what='scm')),
+    }), strict=False),
+    'organization-folder': Options(_extend(COMPUTED_FOLDER_SCHEMA, {
+        'github': Options({'repo-owner': str, 'credentials-id': str,
+                           'api-uri': str}, required=('repo-owner',)),
+    }), strict=False),
+}
+OTHER_JOB_SCHEMA = Options({'views': VIEWS_SCHEMA,
+                            'view-defaults': Options(VIEW_SCHEMAS)},
+                           strict=False)
+
+
+# validation
+
+def _validate_job(job, where, line, report, view_defaults=None):
+    if not isinstance(job, dict):
+        return
+    project_type = job.get('project-type')
+    schema = JOB_SCHEMAS.get(project_type, OTHER_JOB_SCHEMA)
+    name = job.get('name')
+    if name is not None:
+        where = '{0} {1}'.format(where, name)
+
+    def job_report(line, message):
+        report(line, '{0}: {1}'.format(where, message))
+
+    schema.check(job, '', line, job_report)
+    if project_type == 'folder':
+        _check_primary_view(job, line, job_report, view_defaults or {})
+
+
+def _check_primary_view(job, line, report, view_defaults):
+    """
+    ``view_defaults`` maps the names of the defaults found in the same
+    file to their ``view-defaults``, the views of ``job`` are named with
+    the ones it selects like when generating.
+    """
+    primary_view = job.get('primary-view')
+    if not job.get('views') or primary_view is None or \
+            _is_template(primary_view):
+        return
+    selected = job.get('defaults', 'global')
+    try:
+        index = views.view_index(job, view_defaults.get(selected))
+    except (AttributeError, TypeError, ValueError):
+        # malformed views, reported by the schema
+        return
+    if None in index and selected not in view_defaults:
+        # the defaults naming the view are in another file
+        return
+    names = [name for name in index if name is not None]
+    if primary_view in names or any(_is_template(name) for name in names):
+        return
+    report(_line(job, 'primary-view') or line,
+           'primary-view {0} is not one of the views {1}{2}'.format(
+               primary_view, sorted(names), _suggest(primary_view, names)))
+
+
+def validate_data(data, path='<data>'):
+    """
+    Validate the loaded content of one YAML file and return the list of
+    :class:`Problem`. Accepts the usual list of ``job``, ``job-template``
+    and ``defaults`` entries as well as a bare job mapping.
+    """
+    problems = []
+
+    def report(line, message):
+        problems.append(Problem(path, line, message))
+
+    if isinstance(data, dict):
+        _validate_job(data, 'job', _line(data), report)
+    elif isinstance(data, list):
+        view_defaults = {}
+        for entry in data:
+            if isinstance(entry, dict) and \
+                    isinstance(entry.get('defaults'), dict):
+                defaults = entry['defaults']
+                view_defaults[defaults.get('name')] = \
+                    defaults.get('view-defaults') or {}
+        for index, entry in enumerate(data):
+            if not isinstance(entry, dict) or len(entry) != 1:
+                continue
+            (kind, job), = entry.items()
+            if kind in ('job', 'job-template', 'defaults'):
+                job_line = _line(entry, kind) or _line(data, index)
+                _validate_job(job, kind, job_line, report, view_defaults)
+    problems.sort(key=lambda problem: problem.line or 0)
+    return problems
+
+
+def validate_file(path):
+    """Load and validate one YAML file, returns a list of :class:`Problem`."""
+    try:
+        with open(path) as stream:
+            data = load(stream)
+    except yaml.YAMLError as e:
+        mark = getattr(e, 'problem_mark', None)
+        line = mark.line + 1 if mark is not None else None
+        return [Problem(path, line, 'invalid YAML: {0}'.format(
+            getattr(e, 'problem', None) or e))]
+    except (IOError, OSError) as e:
+        return [Problem(path, None, str(e))]
+    return validate_data(data, path)
+
+
+def find_files(paths):
+    """Expand directories in ``paths`` to the YAML files below them."""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            files.extend(os.path.join(root, name) for name in sorted(names)
+                         if name.endswith(YAML_EXTENSIONS))
+    return files
+
+
+def validate_paths(paths, workers=None):
+    """
+    Validate YAML files and directories of YAML files in parallel.
+
+    :arg list paths: Files or directories.
+    :arg int workers: Number of processes, defaults to the number of CPUs.
+      1 validates in the calling process.
+
+    Returns the list of every :class:`Problem` found, in file order.
+    """
+    files = find_files(paths)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = min(workers, len(files))
+    if workers <= 1:
+        results = [validate_file(path) for path in files]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(validate_file, files,
+                               chunksize=max(1, len(files) // (workers * 4)))
+        finally:
+            pool.close()
+            pool.join()
+    return [problem for problems in results for problem in problems]
+
+
+def assert_valid(paths, workers=None):
+    """
+    Like :func:`validate_paths` but raises :class:`ValidationFailed` when
+    anything is wrong.
+    """
+    problems = validate_paths(paths, workers)
+    if problems:
+        raise ValidationFailed(problems)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Validate folder and view definitions.')
+    parser.add_argument('paths', nargs='+',
+                        help='YAML files or directories of YAML files')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of processes (default: CPU count)')
+    args = parser.parse_args(argv)
+    problems = validate_paths(args.paths, args.workers)
+    for problem in problems:
+        sys.stderr.write('{0}\n'.format(problem))
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,11 +4,75 @@ Views show job status.
 **Component**: views
   :Macro: views
   :Entry Point: jenkins_jobs.views
+
+Settings shared by the views of a folder can be given once in a
+``view-defaults`` block mapping view types to default options, on the
+folder itself or in the defaults it uses, ``global`` unless it selects
+others with ``defaults``. Options of a view override the folder defaults,
+which override the ones of the defaults; values are replaced, not
+merged. Views that end up with the same options share one merged
+specification and are generated once.
+
+Example:
+
+    .. literalinclude::  /../tests/views/fixtures/view_defaults.yaml
 """
 
+import copy
 
-import xml.etree.ElementTree as XML
 import jenkins_jobs.modules.base
+from jenkins_jobs_addons import canonical
+from jenkins_jobs_addons import metrics
+from jenkins_jobs_addons import plugins
+from jenkins_jobs_addons import xml_backend as XML
+from jenkins_jobs_addons.canonical import bool_text, int_text
+
+# First plugin versions accepting each field, fields unknown to the
+# installed plugin are dropped. See jenkins_jobs_addons.plugins.
+DELIVERY_PIPELINE_EMITTER = plugins.Emitter(('delivery-pipeline-plugin',), {
+    'showAggregatedPipeline': '0.8.0',
+    'showAvatars': '0.8.0',
+    'showChanges': '0.8.0',
+    'allowManualTriggers': '0.8.0',
+    'showTotalBuildTime': '0.8.3',
+    'allowRebuild': '0.8.6',
+    'allowPipelineStart': '0.8.9',
+    'showDescription': '0.9.0',
+    'showPromotions': '0.9.0',
+    'fullScreenCss': '0.9.5',
+    'embeddedCss': '0.9.5',
+}, options={
+    'showAggregatedPipeline': 'show-aggregated-pipeline',
+    'showAvatars': 'show-avatars',
+    'showChanges': 'show-changes',
+    'allowManualTriggers': 'allow-manual-triggers',
+    'showTotalBuildTime': 'show-total-buildtime',
+    'allowRebuild': 'allow-rebuild',
+    'allowPipelineStart': 'allow-pipeline-start',
+    'showDescription': 'show-description',
+    'showPromotions': 'show-promotions',
+    'fullScreenCss': ('fullscreen-css-url', 'csss-url'),
+    'embeddedCss': ('css-url', 'fullscreen-csss-url'),
+})
+BUILD_PIPELINE_EMITTER = plugins.Emitter(('build-pipeline-plugin',), {
+    'alwaysAllowManualTrigger': '1.3.4',
+    'showPipelineParametersInHeaders': '1.3.4',
+    'showPipelineDefinitionHeader': '1.3.4',
+    'refreshFrequency': '1.3.4',
+    'cssUrl': '1.3.4',
+    'startsWithParameters': '1.4.0',
+    'consoleOutputLinkStyle': '1.4.0',
+}, options={
+    'alwaysAllowManualTrigger': 'always-allow-manual-trigger',
+    'showPipelineParametersInHeaders': 'show-pipeline-parameters-in-header',
+    'showPipelineDefinitionHeader': 'show-pipeline-definition-in-headers',
+    'refreshFrequency': 'refresh-frequency',
+    'cssUrl': ('css-url', 'csss-url'),
+    'startsWithParameters': 'start-with-parameters',
+    'consoleOutputLinkStyle': 'console-output-link-style',
+})
+SORTING_OPTIONS = ['none', 'Name', 'LatestActivity']
+CONSOLE_OUTPUT_LINK_STYLES = ['This Window', 'New Window', 'Light Box']
 
 
 def all_view(parser, xml_parent, data):
@@ -36,10 +100,10 @@ def all_view(parser, xml_parent, data):
         XML.SubElement(view, 'owner', attrib=owner_attrs)
 
     executors = data.get('filter-executors', False)
-    XML.SubElement(view, 'filterExecutors').text = str(executors).lower()
+    XML.SubElement(view, 'filterExecutors').text = bool_text(executors)
 
     queue = data.get('filter-queue', False)
-    XML.SubElement(view, 'filterQueue').text = str(queue).lower()
+    XML.SubElement(view, 'filterQueue').text = bool_text(queue)
 
     properties_attributes = dict()
     properties_attributes['class'] = 'hudson.model.View$PropertyList'
@@ -120,12 +184,13 @@ def delivery_pipeline_view(parser, xml_parent, data):
 
     Example:
 
-    .. literalinclude::  /../tests/views/fixtures/delivery_pipeline.yaml
+    .. literalinclude::  /../tests/views/fixtures/delivery_pipeline_css.yaml
 
     """
     delivery_pipeline = 'se.diabol.jenkins.pipeline.DeliveryPipelineView'
 
     view = XML.SubElement(xml_parent, delivery_pipeline)
+    unsupported = DELIVERY_PIPELINE_EMITTER.unsupported(parser)
     in_folder = data.get('folder', False)
     owner_attrs = dict()
     if in_folder:
@@ -136,10 +201,10 @@ def delivery_pipeline_view(parser, xml_parent, data):
     XML.SubElement(view, 'name').text = data.get('name')
 
     executors = data.get('filter-executors', False)
-    XML.SubElement(view, 'filterExecutors').text = str(executors).lower()
+    XML.SubElement(view, 'filterExecutors').text = bool_text(executors)
 
     queue = data.get('filter-queue', False)
-    XML.SubElement(view, 'filterQueue').text = str(queue).lower()
+    XML.SubElement(view, 'filterQueue').text = bool_text(queue)
 
     properties_attributes = dict()
     properties_attributes['class'] = 'hudson.model.View$PropertyList'
@@ -156,22 +221,23 @@ def delivery_pipeline_view(parser, xml_parent, data):
         first_job = component.get('first-job')
         XML.SubElement(component_spec, 'firstJob').text = first_job
 
-    number_of_pipelines = str(data.get('number-of-pipelines', 3))
+    number_of_pipelines = int_text(data.get('number-of-pipelines', 3))
     XML.SubElement(
         view, 'noOfPipelines').text = number_of_pipelines
 
-    aggregated_pipeline_raw = data.get('show-aggregated-pipeline', False)
-    aggregated_pipeline = str(aggregated_pipeline_raw).lower()
-    XML.SubElement(view, 'showAggregatedPipeline').text = aggregated_pipeline
+    if 'showAggregatedPipeline' not in unsupported:
+        aggregated_pipeline_raw = data.get('show-aggregated-pipeline', False)
+        aggregated_pipeline = bool_text(aggregated_pipeline_raw)
+        XML.SubElement(
+            view, 'showAggregatedPipeline').text = aggregated_pipeline
 
-    number_of_columns = str(data.get('number-of-columns', 1))
+    number_of_columns = int_text(data.get('number-of-columns', 1))
     XML.SubElement(view, 'noOfColumns').text = number_of_columns
 
-    sorting_options = ['none', 'Name', 'LatestActivity']
     sorting = data.get('sorting', 'none')
 
-    if sorting not in sorting_options:
-        raise ValueError('sorting must be one of {} '.format(sorting_options))
+    if sorting not in SORTING_OPTIONS:
+        raise ValueError('sorting must be one of {} '.format(SORTING_OPTIONS))
 
     if sorting == 'none':
         XML.SubElement(view, 'sorting').text = 'none'
@@ -180,32 +246,40 @@ def delivery_pipeline_view(parser, xml_parent, data):
             view, 'sorting'
         ).text = 'se.diabol.jenkins.pipeline.sort.{}Comparator'.format(sorting)
 
-    show_avatars = data.get('show-avatars', False)
-    XML.SubElement(view, 'showAvatars').text = str(show_avatars).lower()
+    if 'showAvatars' not in unsupported:
+        show_avatars = data.get('show-avatars', False)
+        XML.SubElement(view, 'showAvatars').text = bool_text(show_avatars)
 
-    update_interval = str(data.get('update-interval', 1))
+    update_interval = int_text(data.get('update-interval', 1))
     XML.SubElement(view, 'updateInterval').text = update_interval
 
-    show_changes = str(data.get('show-changes', False)).lower()
-    XML.SubElement(view, 'showChanges').text = str(show_changes).lower()
+    if 'showChanges' not in unsupported:
+        show_changes = bool_text(data.get('show-changes', False))
+        XML.SubElement(view, 'showChanges').text = show_changes
 
-    manual_triggers = str(data.get('allow-manual-triggers', False)).lower()
-    XML.SubElement(view, 'allowManualTriggers').text = manual_triggers
+    if 'allowManualTriggers' not in unsupported:
+        manual_triggers = bool_text(data.get('allow-manual-triggers', False))
+        XML.SubElement(view, 'allowManualTriggers').text = manual_triggers
 
-    total_build_time = str(data.get('show-total-buildtime', False)).lower()
-    XML.SubElement(view, 'showTotalBuildTime').text = total_build_time
+    if 'showTotalBuildTime' not in unsupported:
+        total_build_time = bool_text(data.get('show-total-buildtime', False))
+        XML.SubElement(view, 'showTotalBuildTime').text = total_build_time
 
-    allow_rebuild = str(data.get('allow-rebuild', False)).lower()
-    XML.SubElement(view, 'allowRebuild').text = allow_rebuild
+    if 'allowRebuild' not in unsupported:
+        allow_rebuild = bool_text(data.get('allow-rebuild', False))
+        XML.SubElement(view, 'allowRebuild').text = allow_rebuild
 
-    pipeline_start = str(data.get('allow-pipeline-start', False)).lower()
-    XML.SubElement(view, 'allowPipelineStart').text = pipeline_start
+    if 'allowPipelineStart' not in unsupported:
+        pipeline_start = bool_text(data.get('allow-pipeline-start', False))
+        XML.SubElement(view, 'allowPipelineStart').text = pipeline_start
 
-    show_description = str(data.get('show-description', False)).lower()
-    XML.SubElement(view, 'showDescription').text = show_description
+    if 'showDescription' not in unsupported:
+        show_description = bool_text(data.get('show-description', False))
+        XML.SubElement(view, 'showDescription').text = show_description
 
-    show_promotions = str(data.get('show-promotions', False)).lower()
-    XML.SubElement(view, 'showPromotions').text = show_promotions
+    if 'showPromotions' not in unsupported:
+        show_promotions = bool_text(data.get('show-promotions', False))
+        XML.SubElement(view, 'showPromotions').text = show_promotions
 
     xml_jobs = XML.SubElement(view, 'regexpFirstJobs')
     jobs = data.get('regexp-first-jobs', [])
@@ -213,8 +287,15 @@ def delivery_pipeline_view(parser, xml_parent, data):
         xml_job = XML.SubElement(xml_jobs, 'se.diabol.jenkins.pipeline.'
                                            'DeliveryPipelineView_-RegExpSpec')
         XML.SubElement(xml_job, 'regexp').text = job
-    XML.SubElement(view, 'fullScreenCss').text = data.get('csss-url')
-    XML.SubElement(view, 'embeddedCss').text = data.get('fullscreen-csss-url')
+    # csss-url and fullscreen-csss-url were read before the documented
+    # names, keep honouring them; validation reports them as typos.
+    if 'fullScreenCss' not in unsupported:
+        XML.SubElement(view, 'fullScreenCss').text = data.get(
+            'fullscreen-css-url', data.get('csss-url'))
+    if 'embeddedCss' not in unsupported:
+        XML.SubElement(view, 'embeddedCss').text = data.get(
+            'css-url', data.get('fullscreen-csss-url'))
+    DELIVERY_PIPELINE_EMITTER.warn(parser, data)
 
 
 def build_pipeline_view(parser, xml_parent, data):
@@ -277,12 +358,13 @@ def build_pipeline_view(parser, xml_parent, data):
 
     Example:
 
-    .. literalinclude::  /../tests/views/fixtures/build_pipeline_view.yaml
+    .. literalinclude::  /../tests/views/fixtures/build_pipeline_view_css.yaml
     """
     build_pipeline = 'au.com.centrumsystems.hudson.plugin.'\
                      'buildpipeline.BuildPipelineView'
 
     view = XML.SubElement(xml_parent, build_pipeline)
+    unsupported = BUILD_PIPELINE_EMITTER.unsupported(parser)
 
     in_folder = data.get('folder', False)
     owner_attrs = dict()
@@ -294,10 +376,10 @@ def build_pipeline_view(parser, xml_parent, data):
     XML.SubElement(view, 'name').text = data.get('name')
 
     executors = data.get('filter-executors', False)
-    XML.SubElement(view, 'filterExecutors').text = str(executors).lower()
+    XML.SubElement(view, 'filterExecutors').text = bool_text(executors)
 
     queue = data.get('filter-queue', False)
-    XML.SubElement(view, 'filterQueue').text = str(queue).lower()
+    XML.SubElement(view, 'filterQueue').text = bool_text(queue)
 
     properties_attributes = dict()
     properties_attributes['class'] = 'hudson.model.View$PropertyList'
@@ -310,55 +392,165 @@ def build_pipeline_view(parser, xml_parent, data):
     first_job = data.get('first-job', None)
     XML.SubElement(grid, 'firstJob').text = first_job
 
-    display_number_of_builds = str(data.get('display-number-of-builds', 10))
+    display_number_of_builds = int_text(
+        data.get('display-number-of-builds', 10))
     XML.SubElement(view, 'noOfDisplayedBuilds').text = display_number_of_builds
 
     build_view_title = data.get('build-view-title')
     XML.SubElement(view, 'buildViewTitle').text = build_view_title
 
-    console_output_links = ['This Window', 'New Window', 'Light Box']
     console_output_link_style = data.get(
         'console-output-link-style', 'Light Box')
 
-    if console_output_link_style not in console_output_links:
+    if console_output_link_style not in CONSOLE_OUTPUT_LINK_STYLES:
         raise ValueError('console-output-link-style must '
-                         'be one of {}'.format(console_output_links))
+                         'be one of {}'.format(CONSOLE_OUTPUT_LINK_STYLES))
 
-    XML.SubElement(
-        view, 'consoleOutputLinkStyle'
-    ).text = console_output_link_style
+    if 'consoleOutputLinkStyle' not in unsupported:
+        XML.SubElement(
+            view, 'consoleOutputLinkStyle'
+        ).text = console_output_link_style
 
-    XML.SubElement(view, 'cssUrl').text = data.get('csss-url')
+    if 'cssUrl' not in unsupported:
+        XML.SubElement(view, 'cssUrl').text = data.get(
+            'css-url', data.get('csss-url'))
 
     job = XML.SubElement(view, 'triggerOnlyLatestJob')
-    job.text = str(data.get('trigger-only-latest-job', False)).lower()
+    job.text = bool_text(data.get('trigger-only-latest-job', False))
 
-    manual_trigger = data.get('always-allow-manual-trigger', False)
-    manual_trigger = str(manual_trigger).lower()
-    XML.SubElement(
-        view, 'alwaysAllowManualTrigger'
-    ).text = manual_trigger
+    if 'alwaysAllowManualTrigger' not in unsupported:
+        manual_trigger = data.get('always-allow-manual-trigger', False)
+        manual_trigger = bool_text(manual_trigger)
+        XML.SubElement(
+            view, 'alwaysAllowManualTrigger'
+        ).text = manual_trigger
 
-    parmas = str(data.get('show-pipeline-parameters', False)).lower()
+    parmas = bool_text(data.get('show-pipeline-parameters', False))
     XML.SubElement(view, 'showPipelineParameters').text = parmas
 
-    headers_raw = data.get('show-pipeline-parameters-in-header', False)
-    headers = str(headers_raw).lower()
-    XML.SubElement(
-        view, 'showPipelineParametersInHeaders'
-    ).text = headers
+    if 'showPipelineParametersInHeaders' not in unsupported:
+        headers_raw = data.get('show-pipeline-parameters-in-header', False)
+        headers = bool_text(headers_raw)
+        XML.SubElement(
+            view, 'showPipelineParametersInHeaders'
+        ).text = headers
+
+    if 'startsWithParameters' not in unsupported:
+        start_with_params = bool_text(
+            data.get('start-with-parameters', False))
+        XML.SubElement(
+            view, 'startsWithParameters'
+        ).text = start_with_params
+
+    if 'refreshFrequency' not in unsupported:
+        refresh_freq = data.get('refresh-frequency', 3)
+        XML.SubElement(
+            view, 'refreshFrequency').text = int_text(refresh_freq)
+
+    if 'showPipelineDefinitionHeader' not in unsupported:
+        show_def_raw = data.get('show-pipeline-definition-in-headers', False)
+        show_def = bool_text(show_def_raw)
+        XML.SubElement(view, 'showPipelineDefinitionHeader').text = show_def
+    BUILD_PIPELINE_EMITTER.warn(parser, data)
 
-    start_with_params = str(data.get('start-with-parameters', False)).lower()
-    XML.SubElement(
-        view, 'startsWithParameters'
-    ).text = start_with_params
 
-    refresh_freq = data.get('refresh-frequency', 3)
-    XML.SubElement(view, 'refreshFrequency').text = str(refresh_freq)
+def split_view(view):
+    """Returns the type and options of an entry of ``views``."""
+    if isinstance(view, dict):
+        (view_type, options), = view.items()
+        return view_type, options or {}
+    return view, {}
 
-    show_def_raw = data.get('show-pipeline-definition-in-headers', False)
-    show_def = str(show_def_raw).lower()
-    XML.SubElement(view, 'showPipelineDefinitionHeader').text = show_def
+
+def view_name(view_type, options):
+    """Returns the name Jenkins gives a view."""
+    if view_type == 'all':
+        return 'All'
+    return options.get('name')
+
+
+def merge_view(view_type, options, *defaults):
+    """
+    Returns the options of a view of ``view_type`` merged over the
+    ``view-defaults`` blocks in ``defaults``, the weakest first.
+    """
+    merged = {}
+    for block in defaults:
+        merged.update((block or {}).get(view_type) or {})
+    merged.update(options)
+    return merged
+
+
+def view_index(data, *defaults):
+    """
+    Returns a dictionary of the names of the views of ``data``, with
+    ``view-defaults`` applied, to their position.
+    """
+    defaults = defaults + (data.get('view-defaults'),)
+    index = {}
+    for position, view in enumerate(data.get('views', [])):
+        view_type, options = split_view(view)
+        name = view_name(view_type, merge_view(view_type, options, *defaults))
+        index.setdefault(name, position)
+    return index
+
+
+def selected_view_defaults(parser, data):
+    """
+    Returns the ``view-defaults`` of the defaults ``data`` uses, the
+    ``global`` ones unless ``data`` names others, like Jenkins Job Builder
+    does.
+    """
+    parser_data = getattr(parser, 'data', None)
+    if not isinstance(parser_data, dict):
+        return {}
+    defaults = parser_data.get('defaults') or {}
+    selected = defaults.get(data.get('defaults', 'global')) or {}
+    return selected.get('view-defaults') or {}
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item))
+                            for key, item in value.items()))
+    if isinstance(value, list):
+        return ('list',) + tuple(_freeze(item) for item in value)
+    return value
+
+
+class ViewSpecs(object):
+
+    """
+    Intern table of merged view specifications. Every distinct combination
+    of view type, defaults and options is merged once and the same spec
+    object is returned for all views having it.
+
+    :arg int max_size: Number of specs kept, the table starts over when it
+      is full.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._specs = {}
+        self.hits = 0
+        self.misses = 0
+
+    def intern(self, view_type, options, *defaults):
+        """Returns ``(key, spec)``, ``key`` identifies the spec."""
+        key = (view_type, _freeze(options)) + tuple(
+            _freeze((block or {}).get(view_type)) for block in defaults)
+        spec = self._specs.get(key)
+        if spec is not None:
+            self.hits += 1
+            return key, spec
+        self.misses += 1
+        if len(self._specs) >= self.max_size:
+            self._specs.clear()
+        spec = self._specs[key] = merge_view(view_type, options, *defaults)
+        return key, spec
+
+    def __len__(self):
+        return len(self._specs)
 
 
 class Views(jenkins_jobs.modules.base.Base):
@@ -367,7 +559,66 @@ class Views(jenkins_jobs.modules.base.Base):
     component_type = 'view'
     component_list_type = 'views'
 
+    def __init__(self, registry):
+        super(Views, self).__init__(registry)
+        self.specs = ViewSpecs()
+        self._generated = {}
+
+    def _build(self, parser, holder, view_type, key, spec):
+        """
+        Returns new ``(element, digest)`` pairs for a spec. The views of a
+        spec are generated and hashed once per XML backend and kept as
+        templates that never leave this module, every call returns copies
+        so no two jobs share an element.
+        """
+        backend = XML.backend_of(holder)
+        templates = self._generated.get((backend.__name__, key))
+        if templates is None:
+            self.registry.dispatch('view', parser, holder, {view_type: spec})
+            templates = []
+            for element in list(holder):
+                holder.remove(element)
+                templates.append((element, canonical.digest_of(element)))
+            if len(self._generated) >= self.specs.max_size:
+                self._generated.clear()
+            self._generated[(backend.__name__, key)] = templates
+        built = []
+        for template, digest in templates:
+            element = copy.deepcopy(template)
+            canonical.record(element, digest)
+            built.append((element, digest))
+        return built
+
+    def iter_views(self, parser, data, xml_parent=None):
+        """
+        Build the views of ``data`` one at a time.
+
+        Yields ``(name, element, digest)`` for every view, where ``element``
+        is the detached view element and ``digest`` its content digest,
+        recorded so :func:`jenkins_jobs_addons.canonical.digest_of` the job
+        does not hash the view again. Elements are created with the backend
+        of ``xml_parent`` when given, so they can be appended to it.
+
+        Views with the same merged specification are only generated once,
+        but every view yielded is a new element owned by the caller.
+        """
+        if xml_parent is None:
+            holder = XML.Element('views')
+        else:
+            holder = XML.backend_of(xml_parent).Element('views')
+        defaults = (selected_view_defaults(parser, data),
+                    data.get('view-defaults'))
+        for view in data.get('views', []):
+            view_type, options = split_view(view)
+            key, spec = self.specs.intern(view_type, options, *defaults)
+            metrics.VIEWS_GENERATED.inc(type=view_type)
+            for element, digest in self._build(parser, holder, view_type,
+                                               key, spec):
+                yield element.findtext('name'), element, digest
+
     def gen_xml(self, parser, xml_parent, data):
+        started = metrics.start()
         views = XML.SubElement(xml_parent, 'views')
-        for view in data.get('views', []):
-            self.registry.dispatch('view', parser, views, view)
+        for _, element, _ in self.iter_views(parser, data, views):
+            views.append(element)
+        metrics.GENERATE_SECONDS.observe_since(started, stage='views')
@@ -0,0 +1,117 @@
+"""
+Pluggable XML backend for the folder and view builders.
+
+`lxml <https://lxml.de/>`_ builds and serializes element trees considerably
+faster than :mod:`xml.etree.ElementTree`, but Jenkins Job Builder keeps
+adding to the roots returned by ``root_xml`` with ElementTree, whose C
+implementation only accepts its own elements. Roots are therefore
+ElementTree elements, except inside :func:`owned` blocks, which mark trees
+this package serializes itself, such as the ones the benchmarks build.
+Those use lxml when it is
+installed, unless the ``JJB_ADDONS_XML_BACKEND`` environment variable is
+set to ``etree``.
+
+Builders import this module in place of ElementTree::
+
+    from jenkins_jobs_addons import xml_backend as XML
+
+:func:`Element` creates new roots with the active backend while
+:func:`SubElement` always uses the backend of the parent it is given, so
+views attached to a job that Jenkins Job Builder created with ElementTree
+stay ElementTree elements. Jenkins Job Builder serializes both kinds of
+tree the same way, so the generated XML does not depend on the backend.
+
+Attributes are always set in sorted order. Both backends write them in
+insertion order, which would otherwise depend on how the attribute
+dictionary was built.
+"""
+
+import collections
+import contextlib
+import os
+import threading
+import xml.etree.ElementTree as etree
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+BACKEND_ENV = 'JJB_ADDONS_XML_BACKEND'
+
+BACKENDS = {'etree': etree}
+if lxml_etree is not None:
+    BACKENDS['lxml'] = lxml_etree
+
+_backend = None
+_backend_name = None
+_local = threading.local()
+
+
+def set_backend(name=None):
+    """
+    Select the backend used for new root elements of :func:`owned`
+    trees.
+
+    :arg str name: ``lxml``, ``etree`` or ``auto`` (the default), which
+      picks lxml when it is installed.
+    """
+    global _backend, _backend_name
+    if name in (None, '', 'auto'):
+        name = 'lxml' if 'lxml' in BACKENDS else 'etree'
+    if name not in BACKENDS:
+        raise ValueError('XML backend must be one of {0}, lxml may not be '
+                         'installed'.format(sorted(BACKENDS)))
+    _backend = BACKENDS[name]
+    _backend_name = name
+
+
+def get_backend():
+    """Returns the name of the active backend."""
+    return _backend_name
+
+
+def backend_of(element):
+    """Returns the backend module that ``element`` belongs to."""
+    if lxml_etree is not None and isinstance(element, lxml_etree._Element):
+        return lxml_etree
+    return etree
+
+
+@contextlib.contextmanager
+def owned():
+    """
+    Roots created by :func:`Element` in the current thread use the
+    selected backend while this block runs. Only use it for trees that are
+    never handed to Jenkins Job Builder.
+    """
+    previous = getattr(_local, 'owned', False)
+    _local.owned = True
+    try:
+        yield
+    finally:
+        _local.owned = previous
+
+
+def _sorted(attrib, extra):
+    if not attrib and not extra:
+        return {}
+    merged = dict(attrib, **extra)
+    return collections.OrderedDict(sorted(merged.items()))
+
+
+def Element(tag, attrib={}, **extra):
+    backend = _backend if getattr(_local, 'owned', False) else etree
+    return backend.Element(tag, _sorted(attrib, extra))
+
+
+def SubElement(parent, tag, attrib={}, **extra):
+    return backend_of(parent).SubElement(parent, tag, _sorted(attrib, extra))
+
+
+def tostring(element, encoding='utf-8'):
+    """Serialize ``element`` with its own backend."""
+    return backend_of(element).tostring(element, encoding=encoding)
+
+
+set_backend(os.environ.get(BACKEND_ENV))
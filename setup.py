@@ -55,6 +55,9 @@ setup(
     packages=['jenkins_jobs_addons'],
     include_package_data=True,
     install_requires=requirements,
+    extras_require={
+        'lxml': ['lxml'],
+    },
     license="Apache",
     zip_safe=False,
     keywords='jenkins ',
@@ -71,8 +74,14 @@ setup(
     tests_require=['tox'] + test_requirements,
     cmdclass={'test': Tox},
     entry_points={
+        'console_scripts': [
+            'jjb-addons-validate=jenkins_jobs_addons.validation:main',
+        ],
         'jenkins_jobs.projects': [
             'folder=jenkins_jobs_addons.folders:Folder',
+            'multibranch=jenkins_jobs_addons.multibranch:Multibranch',
+            'organization-folder=jenkins_jobs_addons.'
+            'multibranch:OrganizationFolder',
         ],
         'jenkins_jobs.views': [
             'all=jenkins_jobs_addons.views:all_view',
@@ -44,6 +44,7 @@ from jenkins_jobs.modules import (project_flow,
                                   project_maven,
                                   project_multijob)
 from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import multibranch
 
 
 def get_scenarios(fixtures_path, in_ext='yaml', out_ext='xml',
@@ -146,6 +147,10 @@ class BaseTestCase(object):
                 project = project_multijob.MultiJob(None)
             elif (yaml_content['project-type'] == "folder"):
                 project = folders.Folder(None)
+            elif (yaml_content['project-type'] == "multibranch"):
+                project = multibranch.Multibranch(None)
+            elif (yaml_content['project-type'] == "organization-folder"):
+                project = multibranch.OrganizationFolder(None)
 
         if project:
             xml_project = project.root_xml(yaml_content)
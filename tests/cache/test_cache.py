@@ -0,0 +1,108 @@
+""" Test the parsed-definition cache"""
+import collections
+import os
+import fixtures
+import yaml
+from testtools import TestCase
+from jenkins_jobs_addons import cache
+
+
+def loader(path):
+    with open(path) as yaml_file:
+        return yaml.safe_load(yaml_file)
+
+
+class TestDefinitionCache(TestCase):
+
+    def setUp(self):
+        super(TestDefinitionCache, self).setUp()
+        self.tmp = self.useFixture(fixtures.TempDir()).path
+        self.cache = cache.DefinitionCache(os.path.join(self.tmp, 'cache'))
+        self.source = os.path.join(self.tmp, 'folder.yaml')
+        self._write('name: folder_test\nproject-type: folder\n')
+
+    def _write(self, content, mtime=None):
+        with open(self.source, 'w') as source:
+            source.write(content)
+        if mtime is not None:
+            os.utime(self.source, (mtime, mtime))
+
+    def test_miss_then_hit(self):
+        first = self.cache.load(self.source, loader)
+        second = self.cache.load(self.source, loader)
+        self.assertEqual(first, second)
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_changed_content_is_reparsed(self):
+        self._write('name: a\n', mtime=1000)
+        self.assertEqual({'name': 'a'}, self.cache.load(self.source, loader))
+        self._write('name: b\n', mtime=2000)
+        self.assertEqual({'name': 'b'}, self.cache.load(self.source, loader))
+        self.assertEqual(2, self.cache.misses)
+
+    def test_touched_file_uses_content_hash(self):
+        self._write('name: a\n', mtime=1000)
+        self.cache.load(self.source, loader)
+        self._write('name: a\n', mtime=2000)
+        self.cache.load(self.source, self.fail)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.cache.load(self.source, loader)
+        entry_path = self.cache._entry_path(os.path.abspath(self.source))
+        with open(entry_path, 'wb') as entry_file:
+            entry_file.write(b'garbage')
+        self.cache.load(self.source, loader)
+        self.assertEqual(2, self.cache.misses)
+
+    def test_ordered_dict_round_trip(self):
+        data = [collections.OrderedDict([
+            ('name', 'a'), ('views', [collections.OrderedDict([
+                ('all', {'columns': ('status', 'name')})])])])]
+        self.assertTrue(self.cache.store(self.source, data))
+        loaded = self.cache.load(self.source, self.fail)
+        self.assertEqual(data, loaded)
+        self.assertIsInstance(loaded[0], collections.OrderedDict)
+        self.assertEqual(['name', 'views'], list(loaded[0]))
+        self.assertIsInstance(loaded[0]['views'][0], collections.OrderedDict)
+        self.assertIs(dict, type(loaded[0]['views'][0]['all']))
+        self.assertEqual(('status', 'name'),
+                         loaded[0]['views'][0]['all']['columns'])
+
+    def test_unmarshallable_data_is_not_stored(self):
+        self.assertFalse(self.cache.store(self.source, {'name': object()}))
+        self.assertEqual(0, len(self.cache))
+
+    def test_includes_are_not_cached(self):
+        self._write('name: a\nlibraries: !include libraries.yaml\n')
+        self.cache.load(self.source, lambda path: {'name': 'a'})
+        self.cache.load(self.source, lambda path: {'name': 'a'})
+        self.assertEqual(2, self.cache.misses)
+        self.assertEqual(0, len(self.cache))
+        self.assertFalse(self.cache.store(self.source, {'name': 'a'}))
+
+    def test_changed_while_loading_is_not_stored(self):
+        self._write('name: a\n', mtime=1000)
+
+        def editing_loader(path):
+            data = loader(path)
+            self._write('name: b\n', mtime=2000)
+            return data
+
+        self.assertEqual({'name': 'a'},
+                         self.cache.load(self.source, editing_loader))
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual({'name': 'b'}, self.cache.load(self.source, loader))
+        self.assertEqual(2, self.cache.misses)
+
+    def test_prune_bounds_entries(self):
+        small = cache.DefinitionCache(os.path.join(self.tmp, 'small'),
+                                      max_entries=2)
+        for i in range(4):
+            path = os.path.join(self.tmp, 'f{0}.yaml'.format(i))
+            with open(path, 'w') as source:
+                source.write('name: f{0}\n'.format(i))
+            small.load(path, loader)
+        self.assertEqual(2, small.prune())
+        self.assertEqual(2, len(small))
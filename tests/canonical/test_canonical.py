@@ -0,0 +1,96 @@
+""" Test canonical rendering and content digests"""
+import xml.etree.ElementTree as ET
+from testtools import TestCase
+from jenkins_jobs_addons import canonical
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import xml_backend
+
+FOLDER = {
+    'name': 'team',
+    'primary-view': 'All',
+    'health-metrics': ['worst-child-health-metric'],
+    'build-discarder': {'num-to-keep': 10},
+}
+
+
+class TestCanonical(TestCase):
+
+    def tearDown(self):
+        xml_backend.set_backend()
+        super(TestCanonical, self).tearDown()
+
+    def test_bool_text(self):
+        for value in (True, 'True', 'yes', ' on ', 1):
+            self.assertEqual('true', canonical.bool_text(value))
+        for value in (False, 'False', 'no', None, 0):
+            self.assertEqual('false', canonical.bool_text(value))
+
+    def test_int_text(self):
+        self.assertEqual('3', canonical.int_text(3))
+        self.assertEqual('3', canonical.int_text(3.0))
+        self.assertEqual('2.5', canonical.int_text(2.5))
+        self.assertEqual('-1', canonical.int_text('-1 '))
+
+    def test_sorted_attributes(self):
+        first = xml_backend.Element('a', {'z': '1', 'b': '2'})
+        second = xml_backend.Element('a', {'b': '2'}, z='1')
+        self.assertEqual(b'<a b="2" z="1"', xml_backend.tostring(first)[:14])
+        self.assertEqual(xml_backend.tostring(first),
+                         xml_backend.tostring(second))
+
+    def test_digest_follows_content(self):
+        root = folders.Folder(None).root_xml(FOLDER)
+        digest = canonical.digest_of(root)
+        self.assertEqual(64, len(digest))
+        self.assertEqual(digest, canonical.digest_of(
+            folders.Folder(None).root_xml(dict(FOLDER))))
+        root.find('primaryView').text = 'Other'
+        self.assertNotEqual(digest, canonical.digest_of(root))
+
+    def test_digest_ignores_none_text_and_attribute_order(self):
+        first = ET.Element('a', {'x': '1', 'y': '2'})
+        ET.SubElement(first, 'b').text = ''
+        second = ET.Element('a')
+        second.set('y', '2')
+        second.set('x', '1')
+        ET.SubElement(second, 'b')
+        self.assertEqual(canonical.digest_of(first),
+                         canonical.digest_of(second))
+
+    def test_digest_independent_of_backend(self):
+        if 'lxml' not in xml_backend.BACKENDS:
+            self.skipTest('lxml is not installed')
+        digests = set()
+        for backend in ('etree', 'lxml'):
+            xml_backend.set_backend(backend)
+            with xml_backend.owned():
+                root = folders.Folder(None).root_xml(FOLDER)
+            digests.add(canonical.digest_of(root))
+        self.assertEqual(1, len(digests))
+
+    def test_recorded_digest_follows_changes(self):
+        def view(name):
+            element = ET.Element('view')
+            ET.SubElement(element, 'name').text = name
+            return element
+
+        root = ET.Element('views')
+        recorded_view = view('All')
+        root.append(recorded_view)
+        recorded = canonical.record(recorded_view)
+        self.assertEqual(recorded, canonical.digest_of(recorded_view))
+        # the tail belongs to the parent
+        recorded_view.tail = '\n  '
+        self.assertEqual(recorded, canonical.digest_of(recorded_view))
+        recorded_view.find('name').text = 'Changed'
+        self.assertEqual(canonical.digest_of(view('Changed')),
+                         canonical.digest_of(recorded_view))
+        ET.SubElement(recorded_view, 'description')
+        self.assertNotEqual(canonical.digest_of(view('Changed')),
+                            canonical.digest_of(recorded_view))
+        recorded_view.set('class', 'hudson.model.AllView')
+        fresh = view('Changed')
+        ET.SubElement(fresh, 'description')
+        fresh.set('class', 'hudson.model.AllView')
+        self.assertEqual(canonical.digest_of(fresh),
+                         canonical.digest_of(recorded_view))
@@ -0,0 +1,283 @@
+"""
+In-process stand-in for the parts of the Jenkins HTTP API used by the
+snapshot and sync helpers.
+"""
+import json
+import re
+import threading
+import time
+import xml.etree.ElementTree as XML
+
+import fixtures
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib import parse as urllib_parse
+
+FOLDER_CLASS = 'com.cloudbees.hudson.plugins.folder.Folder'
+ROOT_CLASS = 'hudson.model.Hudson'
+FOLDER_CLASSES = (
+    FOLDER_CLASS,
+    'jenkins.branch.OrganizationFolder',
+    'org.jenkinsci.plugins.workflow.multibranch.WorkflowMultiBranchProject',
+)
+
+
+def parse_tree(tree):
+    """
+    Parse a ``tree`` query parameter into a list of
+    ``(field, subfields, (start, end) or None)``.
+    """
+    fields = []
+    pos = 0
+    while pos < len(tree):
+        match = re.compile(r'[\w]+').match(tree, pos)
+        name = match.group(0)
+        pos = match.end()
+        sub = []
+        page = None
+        if pos < len(tree) and tree[pos] == '[':
+            level = 1
+            end = pos + 1
+            while level:
+                level += {'[': 1, ']': -1}.get(tree[end], 0)
+                end += 1
+            sub = parse_tree(tree[pos + 1:end - 1])
+            pos = end
+        if pos < len(tree) and tree[pos] == '{':
+            end = tree.index('}', pos)
+            start, stop = tree[pos + 1:end].split(',')
+            page = (int(start), int(stop))
+            pos = end + 1
+        fields.append((name, sub, page))
+        if pos < len(tree) and tree[pos] == ',':
+            pos += 1
+    return fields
+
+
+class FakeJenkins(fixtures.Fixture):
+
+    """
+    Serves an in-memory item tree over HTTP on a random local port.
+
+    :arg float latency: Seconds every request is delayed by, to simulate
+      network round trips.
+
+    ``max_in_flight`` records the largest number of requests served at
+    the same time.
+    """
+
+    def __init__(self, latency=0.0):
+        super(FakeJenkins, self).__init__()
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.items = {'': {'class': ROOT_CLASS, 'views': ['all'],
+                           'primary_view': 'all', 'config': b''}}
+        self.children = {'': []}
+        self.requests = 0
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def setUp(self):
+        super(FakeJenkins, self).setUp()
+        fake = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake._handle(self, 'GET')
+
+            def do_POST(self):
+                fake._handle(self, 'POST')
+
+        class Server(socketserver.ThreadingMixIn,
+                     BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    # tree manipulation
+
+    def add(self, full_name, jenkins_class=FOLDER_CLASS, views=(),
+            primary_view=None, config=b''):
+        parent = full_name.rpartition('/')[0]
+        if parent not in self.items:
+            raise KeyError(parent)
+        if full_name in self.items:
+            raise ValueError(full_name)
+        self.items[full_name] = {'class': jenkins_class,
+                                 'views': list(views),
+                                 'primary_view': primary_view,
+                                 'config': config}
+        self.children[parent].append(full_name)
+        if jenkins_class in FOLDER_CLASSES:
+            self.children[full_name] = []
+
+    def remove(self, full_name):
+        for child in list(self.children.get(full_name, [])):
+            self.remove(child)
+        self.children.pop(full_name, None)
+        del self.items[full_name]
+        self.children[full_name.rpartition('/')[0]].remove(full_name)
+
+    def relocate(self, full_name, new_full_name):
+        new_parent = new_full_name.rpartition('/')[0]
+        if new_full_name in self.items or new_parent not in self.children:
+            raise ValueError(new_full_name)
+        prefix = full_name + '/'
+        moved = [full_name] + [name for name in self.items
+                               if name.startswith(prefix)]
+        self.children[full_name.rpartition('/')[0]].remove(full_name)
+        self.children[new_parent].append(new_full_name)
+        for name in moved:
+            target = new_full_name + name[len(full_name):]
+            self.items[target] = self.items.pop(name)
+            if name in self.children:
+                self.children[target] = [
+                    new_full_name + child[len(full_name):]
+                    for child in self.children.pop(name)]
+
+    def populate(self, total, fanout=100, views=1):
+        """
+        Add ``total`` folders, breadth first, with ``fanout`` children per
+        folder and ``views`` views each.
+        """
+        parents = ['']
+        count = 0
+        while count < total:
+            next_parents = []
+            for parent in parents:
+                for i in range(fanout):
+                    if count == total:
+                        break
+                    name = 'f{0}'.format(i)
+                    full_name = parent + '/' + name if parent else name
+                    view_names = ['view-{0}'.format(v) for v in range(views)]
+                    self.add(full_name, views=view_names,
+                             primary_view=view_names[0] if views else None)
+                    next_parents.append(full_name)
+                    count += 1
+            parents = next_parents
+
+    # HTTP handling
+
+    def _render(self, full_name, fields):
+        item = self.items[full_name]
+        out = {}
+        for name, sub, page in fields:
+            if name == 'name':
+                out['name'] = full_name.rpartition('/')[2]
+            elif name == '_class':
+                out['_class'] = item['class']
+            elif name == 'primaryView' and item['primary_view']:
+                out['primaryView'] = {'name': item['primary_view']}
+            elif name == 'views':
+                out['views'] = [{'name': view} for view in item['views']]
+            elif name == 'jobs' and full_name in self.children:
+                children = self.children[full_name]
+                if page is not None:
+                    children = children[page[0]:page[1]]
+                out['jobs'] = [self._render(child, sub)
+                               for child in children]
+        return out
+
+    def _split(self, path):
+        parts = path.strip('/').split('/')
+        names = []
+        while len(parts) >= 2 and parts[0] == 'job':
+            names.append(urllib_parse.unquote(parts[1]))
+            parts = parts[2:]
+        return '/'.join(names), parts
+
+    def _parse_config(self, config):
+        root = XML.fromstring(config)
+        views = [view.findtext('name') for view in root.findall('views/*')]
+        return {'class': root.tag, 'views': [v for v in views if v],
+                'primary_view': root.findtext('primaryView'),
+                'config': config}
+
+    def _handle(self, request, method):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            self._respond(request, method)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _respond(self, request, method):
+        if self.latency:
+            time.sleep(self.latency)
+        url = urllib_parse.urlparse(request.path)
+        query = dict(urllib_parse.parse_qsl(url.query))
+        length = int(request.headers.get('Content-Length') or 0)
+        body = request.rfile.read(length) if length else b''
+        full_name, rest = self._split(url.path)
+        with self.lock:
+            self.requests += 1
+            self.calls.append((method, url.path))
+            status, payload = self._dispatch(method, full_name, rest,
+                                             query, body)
+        request.send_response(status)
+        request.send_header('Content-Length', str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
+
+    def _dispatch(self, method, full_name, rest, query, body):
+        if full_name not in self.items:
+            return 404, b''
+        action = '/'.join(rest)
+        if method == 'GET' and action == 'api/json':
+            tree = parse_tree(query.get('tree', 'name'))
+            data = self._render(full_name, tree)
+            return 200, json.dumps(data).encode('utf-8')
+        if method == 'GET' and action == 'config.xml':
+            return 200, self.items[full_name]['config']
+        if method != 'POST':
+            return 405, b''
+        if action == 'createItem':
+            name = query.get('name')
+            child = full_name + '/' + name if full_name else name
+            if child in self.items or full_name not in self.children:
+                return 400, b''
+            item = self._parse_config(body)
+            self.add(child, item['class'], item['views'],
+                     item['primary_view'], body)
+            return 200, b''
+        if action == 'config.xml':
+            self.items[full_name].update(self._parse_config(body))
+            return 200, b''
+        if action == 'doDelete' and full_name:
+            self.remove(full_name)
+            return 200, b''
+        if action in ('confirmRename', 'move/move') and full_name:
+            parent, _, name = full_name.rpartition('/')
+            if action == 'confirmRename':
+                name = query.get('newName')
+            else:
+                form = dict(urllib_parse.parse_qsl(body.decode('utf-8')))
+                parent = form.get('destination', '').strip('/')
+            target = parent + '/' + name if parent else name
+            try:
+                self.relocate(full_name, target)
+            except ValueError:
+                return 400, b''
+            return 200, b''
+        if len(rest) == 3 and rest[0] == 'view' and rest[2] == 'doDelete':
+            view = urllib_parse.unquote(rest[1])
+            views = self.items[full_name]['views']
+            if view not in views:
+                return 404, b''
+            views.remove(view)
+            return 200, b''
+        return 404, b''
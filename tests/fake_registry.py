@@ -0,0 +1,19 @@
+"""
+Stand-in for the Jenkins Job Builder module registry dispatching the views
+of this package, shared by the tests and the benchmarks.
+"""
+from jenkins_jobs_addons import views
+
+BUILDERS = {
+    'all': views.all_view,
+    'build_pipeline': views.build_pipeline_view,
+    'delivery_pipeline': views.delivery_pipeline_view,
+}
+
+
+class Registry(object):
+    """Dispatches views like the Jenkins Job Builder module registry"""
+
+    def dispatch(self, component_type, parser, xml_parent, component):
+        (name, data), = component.items()
+        BUILDERS[name](parser, xml_parent, data)
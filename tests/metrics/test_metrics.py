@@ -0,0 +1,114 @@
+""" Test the Prometheus text format metrics"""
+import os
+import subprocess
+import sys
+import fixtures
+from jenkins_jobs.xml_config import XmlJob
+from testtools import TestCase
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import metrics
+from jenkins_jobs_addons import prune
+from jenkins_jobs_addons import upload
+from jenkins_jobs_addons.remote import JenkinsClient
+from jenkins_jobs_addons.snapshot import Snapshot
+from tests.fake_jenkins import FakeJenkins
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self):
+        super(TestMetrics, self).setUp()
+        self.registry = metrics.Registry()
+        self.registry.enabled = True
+        metrics.REGISTRY.reset()
+        self.addCleanup(metrics.REGISTRY.reset)
+        self.addCleanup(metrics.enable, False)
+
+    def test_counter(self):
+        counter = self.registry.counter('items_total', 'Items.', ('type',))
+        counter.inc(type='folder')
+        counter.inc(2, type='folder')
+        counter.inc(type='view "x"')
+        self.assertEqual(3, counter.value(type='folder'))
+        self.assertEqual(
+            '# HELP items_total Items.\n'
+            '# TYPE items_total counter\n'
+            'items_total{type="folder"} 3\n'
+            'items_total{type="view \\"x\\""} 1\n',
+            self.registry.render())
+        self.assertRaises(ValueError, counter.inc, kind='folder')
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency.',
+                                            buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value)
+        self.assertEqual(
+            '# HELP latency_seconds Latency.\n'
+            '# TYPE latency_seconds histogram\n'
+            'latency_seconds_bucket{le="0.1"} 1\n'
+            'latency_seconds_bucket{le="1"} 3\n'
+            'latency_seconds_bucket{le="+Inf"} 4\n'
+            'latency_seconds_sum 4.05\n'
+            'latency_seconds_count 4\n',
+            self.registry.render())
+
+    def test_disabled_is_noop(self):
+        self.assertIsNone(metrics.start())
+        folders.Folder(None).root_xml({'name': 'team'})
+        self.assertEqual(0, metrics.ITEMS_GENERATED.value(type='folder'))
+        self.assertNotIn('jjb_addons_items_generated_total{',
+                         metrics.REGISTRY.render())
+
+    def test_generation_and_upload(self):
+        metrics.enable()
+        jenkins = self.useFixture(FakeJenkins())
+        client = JenkinsClient(jenkins.url)
+        items = [{'name': 'team'}, {'name': 'team/api'},
+                 {'name': 'missing/child'}]
+        pipeline = upload.UploadPipeline(
+            upload.client_uploader(client, existing=set()), workers=2)
+        project = folders.Folder(None)
+        pipeline.run(upload.generate(
+            XmlJob(project.root_xml(data), data['name']) for data in items))
+        self.assertEqual(3, metrics.ITEMS_GENERATED.value(type='folder'))
+        self.assertEqual(3, metrics.GENERATE_SECONDS.count(stage='root'))
+        self.assertEqual(2, metrics.UPLOADS.value(outcome='success'))
+        self.assertEqual(1, metrics.UPLOADS.value(outcome='failure'))
+        self.assertEqual(pipeline.generated.bytes,
+                         metrics.BYTES_EMITTED.value())
+
+    def test_prune(self):
+        metrics.enable()
+        jenkins = self.useFixture(FakeJenkins())
+        client = JenkinsClient(jenkins.url)
+        for name in ('team', 'team/old', 'team/old/deep'):
+            jenkins.add(name, views=['All', 'stale'], primary_view='All')
+        plan = prune.plan_prune(Snapshot.fetch(client, 'team'),
+                                {'team': ['All']})
+        prune.execute_prune(client, plan)
+        self.assertEqual(2, metrics.PRUNED.value(kind='folder',
+                                                 outcome='deleted'))
+        self.assertEqual(1, metrics.PRUNED.value(kind='view',
+                                                 outcome='deleted'))
+
+    def test_write_atomic(self):
+        tmp = self.useFixture(fixtures.TempDir()).path
+        path = os.path.join(tmp, 'jjb.prom')
+        self.registry.counter('runs_total', 'Runs.').inc()
+        self.registry.write(path)
+        with open(path) as f:
+            self.assertIn('runs_total 1\n', f.read())
+        self.assertEqual(['jjb.prom'], os.listdir(tmp))
+
+    def test_environment_variable(self):
+        tmp = self.useFixture(fixtures.TempDir()).path
+        path = os.path.join(tmp, 'jjb.prom')
+        env = dict(os.environ, JJB_ADDONS_METRICS_FILE=path)
+        subprocess.check_call([
+            sys.executable, '-c',
+            'from jenkins_jobs_addons import folders\n'
+            'folders.Folder(None).root_xml({"name": "team"})\n'], env=env)
+        with open(path) as f:
+            self.assertIn('jjb_addons_items_generated_total{type="folder"} 1',
+                          f.read())
@@ -0,0 +1,24 @@
+""" Test the validation of multibranch build strategies"""
+import xml.etree.ElementTree as ET
+from testtools import TestCase
+from jenkins_jobs_addons import multibranch
+
+
+class TestBuildStrategies(TestCase):
+
+    def _tags(self, options):
+        xml_parent = ET.Element('source')
+        multibranch.build_strategies(xml_parent, [{'tags': options}])
+        return xml_parent.find('buildStrategies')[0]
+
+    def test_tag_ages(self):
+        tags = self._tags({'ignore-tags-older-than': 7,
+                           'ignore-tags-newer-than': 0})
+        self.assertEqual('-1', tags.findtext('atLeastMillis'))
+        self.assertEqual('604800000', tags.findtext('atMostMillis'))
+
+    def test_invalid_tag_ages(self):
+        for value in ('7', 1.5, True, -2, None):
+            e = self.assertRaises(ValueError, self._tags,
+                                  {'ignore-tags-older-than': value})
+            self.assertIn('ignore-tags-older-than must be', str(e))
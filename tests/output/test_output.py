@@ -0,0 +1,88 @@
+""" Test the output directory layouts"""
+import json
+import os
+import fixtures
+from testtools import TestCase
+from jenkins_jobs_addons import output
+
+ITEMS = [('team', b'<team/>'), ('team/api', b'<api/>'),
+         ('team/api/jobs', b'<jobs/>'), ('other', b'<other/>')]
+
+
+class TestOutputWriter(TestCase):
+
+    def setUp(self):
+        super(TestOutputWriter, self).setUp()
+        self.tmp = self.useFixture(fixtures.TempDir()).path
+
+    def write(self, items, **kwargs):
+        with output.OutputWriter(self.tmp, **kwargs) as writer:
+            for full_name, config_xml in items:
+                writer.write(full_name, config_xml)
+        return writer
+
+    def read(self, full_name):
+        with open(output.locate(self.tmp, full_name), 'rb') as f:
+            return f.read()
+
+    def test_hierarchy(self):
+        self.write(ITEMS, batch_size=2)
+        self.assertEqual(os.path.join('team', 'jobs', 'api', 'jobs', 'jobs',
+                                      'config.xml'),
+                         output.item_path('team/api/jobs'))
+        for full_name, config_xml in ITEMS:
+            self.assertEqual(config_xml, self.read(full_name))
+        self.assertEqual(b'<api/>', open(os.path.join(
+            self.tmp, 'team', 'jobs', 'api', 'config.xml'), 'rb').read())
+
+    def test_sharded_fan_out(self):
+        items = [('team/f{0}'.format(i), b'<f/>') for i in range(600)]
+        self.write(items, layout='sharded')
+        entries = os.listdir(self.tmp)
+        self.assertIn(output.MANIFEST_NAME, entries)
+        self.assertLessEqual(len(entries), 257)
+        for name in entries:
+            if name != output.MANIFEST_NAME:
+                self.assertEqual(2, len(name))
+                self.assertLess(len(os.listdir(os.path.join(self.tmp,
+                                                            name))), 20)
+        self.assertEqual(b'<f/>', self.read('team/f599'))
+        self.assertNotIn('.tmp', ''.join(
+            name for _, _, names in os.walk(self.tmp) for name in names))
+
+    def test_manifest(self):
+        self.write(ITEMS, layout='sharded', levels=2)
+        with open(os.path.join(self.tmp, output.MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        self.assertEqual('sharded', manifest['layout'])
+        self.assertEqual(2, manifest['levels'])
+        self.assertEqual(set(name for name, _ in ITEMS),
+                         set(manifest['items']))
+        entry = manifest['items']['team/api']
+        self.assertEqual(output.item_path('team/api', 'sharded', 2),
+                         entry['path'])
+        self.assertEqual(3, entry['path'].count(os.sep) + 1)
+        self.assertIsNone(output.locate(self.tmp, 'missing'))
+
+    def test_unchanged_items_are_not_rewritten(self):
+        self.write(ITEMS)
+        changed = list(ITEMS)
+        changed[1] = ('team/api', b'<api version="2"/>')
+        writer = self.write(changed)
+        self.assertEqual(1, writer.written)
+        self.assertEqual(3, writer.unchanged)
+        self.assertEqual(b'<api version="2"/>', self.read('team/api'))
+
+    def test_partial_runs_and_stale_items(self):
+        self.write(ITEMS[:2])
+        self.write(ITEMS[2:])
+        manifest = output.load_manifest(self.tmp)
+        self.assertEqual(4, len(manifest['items']))
+        stale = output.locate(self.tmp, 'other')
+        self.write(ITEMS[:3], remove_stale=True)
+        self.assertFalse(os.path.exists(stale))
+        self.assertIsNone(output.locate(self.tmp, 'other'))
+
+    def test_invalid_layout(self):
+        self.assertRaises(ValueError, output.OutputWriter, self.tmp,
+                          layout='flat')
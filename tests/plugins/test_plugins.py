@@ -0,0 +1,123 @@
+""" Test plugin version aware emitters"""
+import fixtures
+from testtools import TestCase
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import plugins
+from jenkins_jobs_addons import views
+from jenkins_jobs_addons import xml_backend as XML
+
+
+class Registry(object):
+
+    def __init__(self, **versions):
+        self.versions = versions
+        self.lookups = 0
+
+    def get_plugin_info(self, name):
+        self.lookups += 1
+        if name in self.versions:
+            return {'shortName': name, 'version': self.versions[name]}
+        return {}
+
+
+class TestEmitter(TestCase):
+
+    def setUp(self):
+        super(TestEmitter, self).setUp()
+        self.emitter = plugins.Emitter(('new-name', 'old-name'), {
+            'recent': '1.10',
+            'ancient': '0.1',
+        })
+
+    def test_version_tuple(self):
+        self.assertEqual((1, 4, 3), plugins.version_tuple('1.4.3-SNAPSHOT'))
+        self.assertLess(plugins.version_tuple('1.9'),
+                        plugins.version_tuple('1.10'))
+
+    def test_unknown_plugin_keeps_everything(self):
+        self.assertEqual(frozenset(), self.emitter.unsupported(Registry()))
+        self.assertEqual(frozenset(), self.emitter.unsupported(None))
+
+    def test_resolved_once_per_registry(self):
+        registry = Registry(**{'old-name': '1.9'})
+        for _ in range(5):
+            self.assertEqual(frozenset(['recent']),
+                             self.emitter.unsupported(registry))
+        # one lookup per plugin name on the first call only
+        self.assertEqual(2, registry.lookups)
+        newer = Registry(**{'new-name': '2.0'})
+        self.assertEqual(frozenset(), self.emitter.unsupported(newer))
+
+    def test_builders_skip_fields(self):
+        registry = Registry(**{'build-pipeline-plugin': '1.3.0'})
+        root = XML.Element('root')
+        views.build_pipeline_view(registry, root, {
+            'name': 'pipeline', 'first-job': 'build'})
+        view = root[0]
+        for tag in views.BUILD_PIPELINE_EMITTER.fields:
+            self.assertIsNone(view.find(tag))
+        self.assertEqual('build', view.findtext('gridBuilder/firstJob'))
+        self.assertEqual('false', view.findtext('triggerOnlyLatestJob'))
+
+    def test_requested_options_warn(self):
+        log = self.useFixture(fixtures.FakeLogger(name=plugins.__name__))
+        emitter = plugins.Emitter(('new-name',), {'recent': '1.10'},
+                                  options={'recent': ('recent', 'legacy')})
+        registry = Registry(**{'new-name': '1.0'})
+        emitter.warn(registry, {'other': 1})
+        self.assertEqual('', log.output)
+        emitter.warn(registry, {'legacy': 1})
+        emitter.warn(registry, {'legacy': 1})
+        self.assertEqual('legacy is ignored, it needs the new-name plugin '
+                         '1.10 or later\n', log.output)
+
+
+class TestFolderVariants(TestCase):
+
+    def setUp(self):
+        super(TestFolderVariants, self).setUp()
+        self.log = self.useFixture(fixtures.FakeLogger(name=plugins.__name__))
+
+    def test_old_plugins(self):
+        folder = folders.Folder(Registry(**{
+            'cloudbees-folder': '6.0',
+            'workflow-cps-global-lib': '2.15',
+        }))
+        xml = folder.root_xml({
+            'build-discarder': {'num-to-keep': 10},
+            'libraries': [{
+                'name': 'lib',
+                'scm': {'git': {'remote': 'https://example.com/lib.git'}},
+                'caching': {'refresh-minutes': 60},
+            }],
+        })
+        properties = xml.find('properties')
+        self.assertIsNone(properties.find(folders.DISCARDER_CLASS))
+        library = properties.find('{0}/libraries/{1}'.format(
+            folders.LIBRARIES_CLASS, folders.LIBRARY_CLASS))
+        self.assertIsNotNone(library.find('includeInChangesets'))
+        self.assertIsNone(library.find('cachingConfiguration'))
+        self.assertIn('build-discarder is ignored, it needs the '
+                      'cloudbees-folder plugin 6.16 or later',
+                      self.log.output)
+        self.assertIn('caching is ignored, it needs the pipeline-groovy-lib '
+                      'plugin 2.21 or later', self.log.output)
+
+    def test_warned_once_and_defaults_are_silent(self):
+        folder = folders.Folder(Registry(**{
+            'cloudbees-folder': '6.0',
+            'workflow-cps-global-lib': '2.10',
+        }))
+        for name in ('a', 'b'):
+            xml = folder.root_xml({
+                'name': name,
+                'build-discarder': {'num-to-keep': 10},
+                'libraries': [{
+                    'name': 'lib',
+                    'scm': {'git': {'remote': 'https://example.com/lib'}},
+                }],
+            })
+        self.assertIsNone(xml.find('properties').find(
+            folders.DISCARDER_CLASS))
+        self.assertEqual(1, self.log.output.count('build-discarder'))
+        self.assertNotIn('include-in-changesets', self.log.output)
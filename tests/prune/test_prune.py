@@ -0,0 +1,82 @@
+""" Test pruning of stale folders and views against a fake Jenkins"""
+from testtools import TestCase
+from jenkins_jobs_addons import prune
+from jenkins_jobs_addons.remote import JenkinsClient, JenkinsError
+from jenkins_jobs_addons.snapshot import Snapshot
+from tests.fake_jenkins import FakeJenkins
+
+
+class TestPrune(TestCase):
+
+    def setUp(self):
+        super(TestPrune, self).setUp()
+        self.jenkins = self.useFixture(FakeJenkins())
+        self.client = JenkinsClient(self.jenkins.url)
+        for name in ['team', 'team/api', 'team/old', 'team/old/deep',
+                     'team/old/deep/deeper', 'other']:
+            self.jenkins.add(name, views=['All', 'stale'],
+                             primary_view='All')
+        self.generated = {'team': ['All'], 'team/api': None}
+
+    def _plan(self):
+        return prune.plan_prune(Snapshot.fetch(self.client), self.generated)
+
+    def test_plan(self):
+        plan = self._plan()
+        self.assertEqual(['team/old/deep/deeper', 'team/old/deep',
+                          'team/old'], plan.folders)
+        self.assertEqual([('team', 'stale')], plan.views)
+
+    def test_organization_folder_children_are_kept(self):
+        self.jenkins.add('team/org', 'jenkins.branch.OrganizationFolder')
+        self.jenkins.add('team/org/repo1', 'org.jenkinsci.plugins.workflow.'
+                         'multibranch.WorkflowMultiBranchProject')
+        self.generated['team/org'] = None
+        plan = self._plan()
+        self.assertEqual(['team/old/deep/deeper', 'team/old/deep',
+                          'team/old'], plan.folders)
+        # a snapshot that indexed the repository projects
+        remote = Snapshot(dict(
+            (name, {'class': item['class'], 'views': item['views'],
+                    'primary_view': item['primary_view']})
+            for name, item in self.jenkins.items.items()))
+        self.assertIn('team/org/repo1', remote.folders())
+        plan = prune.plan_prune(remote, self.generated)
+        self.assertNotIn('team/org/repo1', plan.folders)
+
+    def test_dry_run(self):
+        report = prune.execute_prune(self.client, self._plan(),
+                                     dry_run=True)
+        requests = self.client.requests
+        self.assertIn('would delete folder team/old/deep', report.format())
+        self.assertIn('would delete view stale of team', report.format())
+        self.assertEqual(requests, self.client.requests)
+        self.assertIn('team/old', self.jenkins.items)
+
+    def test_prune(self):
+        report = prune.execute_prune(self.client, self._plan(), workers=2)
+        self.assertEqual([], report.failed)
+        self.assertEqual(['', 'other', 'team', 'team/api'],
+                         sorted(self.jenkins.items))
+        self.assertEqual(['All'], self.jenkins.items['team']['views'])
+        deletes = [path for method, path in self.jenkins.calls
+                   if path.endswith('/doDelete')]
+        self.assertEqual('/job/team/view/stale/doDelete', deletes[0])
+        self.assertEqual(['/job/team/job/old/job/deep/job/deeper/doDelete',
+                          '/job/team/job/old/job/deep/doDelete',
+                          '/job/team/job/old/doDelete'], deletes[1:])
+
+    def test_max_deletions(self):
+        self.assertRaises(prune.PruneError, prune.execute_prune,
+                          self.client, self._plan(), max_deletions=3)
+        self.assertIn('team/old', self.jenkins.items)
+
+    def test_failed_child_blocks_parent(self):
+        plan = self._plan()
+        self.jenkins.remove('team/old/deep/deeper')
+        report = prune.execute_prune(self.client, plan)
+        self.assertEqual(1, len(report.failed))
+        self.assertIsInstance(report.failed[0][1], JenkinsError)
+        self.assertEqual(['folder team/old/deep', 'folder team/old'],
+                         report.skipped)
+        self.assertIn('team/old/deep', self.jenkins.items)
@@ -0,0 +1,83 @@
+""" Test the shard planner"""
+import os
+import fixtures
+from testtools import TestCase
+from jenkins_jobs_addons import sharding
+
+
+def folder(name):
+    return {'job': {'name': name, 'project-type': 'folder'}}
+
+
+class TestShardPlanner(TestCase):
+
+    def setUp(self):
+        super(TestShardPlanner, self).setUp()
+        self.definitions = [
+            folder('a'), folder('a/one'), folder('a/one/deep'),
+            folder('b'), folder('b/one'),
+            folder('c'), folder('d'),
+        ]
+
+    def test_children_share_parent_shard(self):
+        manifest = sharding.plan_shards(self.definitions, 3)
+        for shard in manifest['shards']:
+            items = set(shard['items'])
+            for name in items:
+                parent = name.rsplit('/', 1)[0]
+                if parent != name:
+                    self.assertIn(parent, items)
+
+    def test_parents_listed_first(self):
+        manifest = sharding.plan_shards(self.definitions, 1)
+        items = manifest['shards'][0]['items']
+        self.assertLess(items.index('a'), items.index('a/one'))
+        self.assertLess(items.index('a/one'), items.index('a/one/deep'))
+
+    def test_balance_by_count(self):
+        manifest = sharding.plan_shards(self.definitions, 2)
+        weights = sorted(s['weight'] for s in manifest['shards'])
+        self.assertEqual([3.0, 4.0], weights)
+
+    def test_balance_by_cost(self):
+        costs = {'c': 10.0, 'a': 1.0, 'a/one': 1.0, 'a/one/deep': 1.0}
+        manifest = sharding.plan_shards(self.definitions, 2, costs)
+        heavy = [s for s in manifest['shards'] if 'c' in s['groups']][0]
+        self.assertEqual(['c'], heavy['groups'])
+
+    def test_select_shard(self):
+        manifest = sharding.plan_shards(self.definitions, 2)
+        selected = []
+        for shard in manifest['shards']:
+            names = [sharding.definition_name(d) for d in
+                     sharding.select_shard(self.definitions, manifest,
+                                           shard['index'])]
+            self.assertEqual(shard['items'], names)
+            selected.extend(names)
+        self.assertEqual(7, len(selected))
+
+    def test_verify_manifest(self):
+        manifest = sharding.plan_shards(self.definitions, 2)
+        produced = dict((s['index'], list(s['items']))
+                        for s in manifest['shards'])
+        report = sharding.verify_manifest(manifest, produced)
+        self.assertEqual({'missing': [], 'duplicates': [], 'unexpected': []},
+                         report)
+
+        first, second = manifest['shards']
+        produced[first['index']].remove(first['items'][0])
+        produced[second['index']].append(second['items'][0])
+        report = sharding.verify_manifest(manifest, produced)
+        self.assertEqual([first['items'][0]], report['missing'])
+        self.assertEqual([second['items'][0]], report['duplicates'])
+
+    def test_duplicate_definition(self):
+        self.assertRaises(ValueError, sharding.plan_shards,
+                          self.definitions + [folder('a')], 2)
+
+    def test_manifest_round_trip(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'shards.json')
+        manifest = sharding.plan_shards(self.definitions, 2)
+        sharding.write_manifest(manifest, path)
+        self.assertEqual(manifest, sharding.read_manifest(path))
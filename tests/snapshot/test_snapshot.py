@@ -0,0 +1,214 @@
+""" Test the remote snapshot against a fake Jenkins"""
+import os
+import fixtures
+from testtools import TestCase
+from jenkins_jobs_addons.remote import JenkinsClient
+from jenkins_jobs_addons import snapshot
+from tests.fake_jenkins import FakeJenkins
+
+MULTIBRANCH = \
+    'org.jenkinsci.plugins.workflow.multibranch.WorkflowMultiBranchProject'
+ORGANIZATION = 'jenkins.branch.OrganizationFolder'
+PIPELINE = 'org.jenkinsci.plugins.workflow.job.WorkflowJob'
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        super(TestSnapshot, self).setUp()
+        self.jenkins = self.useFixture(FakeJenkins())
+        self.client = JenkinsClient(self.jenkins.url)
+
+    def test_large_tree_in_few_calls(self):
+        self.jenkins.populate(100000, fanout=100)
+        remote = snapshot.Snapshot.fetch(self.client)
+        # 100000 folders plus the root
+        self.assertEqual(100001, len(remote))
+        self.assertEqual(1, self.client.requests)
+        self.assertEqual(['view-0'], remote.items['f3/f7/f9']['views'])
+        self.assertEqual('view-0', remote.items['f3/f7/f9']['primary_view'])
+        self.assertEqual(100, len(remote.children('f3')))
+
+    def test_paging(self):
+        self.jenkins.populate(250, fanout=25)
+        remote = snapshot.Snapshot.fetch(self.client, page_size=10)
+        self.assertEqual(251, len(remote))
+        # 25 top-level folders in pages of 10
+        self.assertEqual(3, self.client.requests)
+
+    def test_folders_below_depth_are_fetched(self):
+        self.jenkins.populate(20, fanout=2)
+        remote = snapshot.Snapshot.fetch(self.client, depth=2)
+        self.assertEqual(sorted(self.jenkins.items), sorted(remote.items))
+
+    def test_subtree(self):
+        self.jenkins.populate(30, fanout=3)
+        remote = snapshot.Snapshot.fetch(self.client, root='f1')
+        self.assertEqual(sorted(n for n in self.jenkins.items
+                                if n == 'f1' or n.startswith('f1/')),
+                         sorted(remote.items))
+
+    def test_save_and_load(self):
+        self.jenkins.populate(10, fanout=5)
+        remote = snapshot.Snapshot.fetch(self.client)
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'snapshot.json')
+        remote.save(path)
+        self.assertEqual(remote.items, snapshot.Snapshot.load(path).items)
+
+
+class TestComputedFolders(TestCase):
+
+    def setUp(self):
+        super(TestComputedFolders, self).setUp()
+        self.jenkins = self.useFixture(FakeJenkins())
+        self.client = JenkinsClient(self.jenkins.url)
+        self.jenkins.add('team')
+        self.jenkins.add('team/svc', MULTIBRANCH)
+        self.jenkins.add('team/svc/main', PIPELINE)
+        self.jenkins.add('team/org', ORGANIZATION)
+        self.jenkins.add('team/org/repo1', MULTIBRANCH)
+        self.jenkins.add('team/org/repo1/master', PIPELINE)
+        self.jenkins.add('team/old')
+        self.desired = {'team': [], 'team/svc': [], 'team/org': []}
+
+    def test_not_descended_into(self):
+        remote = snapshot.Snapshot.fetch(self.client, depth=1)
+        self.assertEqual(['', 'team', 'team/old', 'team/org', 'team/svc'],
+                         sorted(remote.items))
+        plan = snapshot.plan_sync(remote, self.desired)
+        self.assertEqual(['team/old'], plan.delete)
+
+    def test_children_are_never_deleted(self):
+        # a snapshot saved with the children of computed folders
+        remote = snapshot.Snapshot(dict(
+            (name, {'class': item['class'], 'views': [],
+                    'primary_view': None})
+            for name, item in self.jenkins.items.items()))
+        self.assertTrue(remote.computed('team/org/repo1/master'))
+        self.assertFalse(remote.computed('team/org'))
+        plan = snapshot.plan_sync(remote, self.desired)
+        self.assertEqual(['team/old'], plan.delete)
+        self.assertEqual([], plan.create)
+
+
+class TestPlanSync(TestCase):
+
+    def setUp(self):
+        super(TestPlanSync, self).setUp()
+        folder = 'com.cloudbees.hudson.plugins.folder.Folder'
+        self.remote = snapshot.Snapshot(dict(
+            (name, {'class': folder, 'views': views, 'primary_view': None})
+            for name, views in [
+                ('', ['all']),
+                ('team', ['a']),
+                ('team/old', []),
+                ('team/old/deeper', []),
+                ('team/service', ['a', 'b']),
+                ('other', []),
+            ]))
+
+    def test_plan(self):
+        plan = snapshot.plan_sync(self.remote, {
+            'team': ['a'],
+            'team/service': ['a', 'c'],
+            'team/new': [],
+            'team/new/child': [],
+        })
+        self.assertEqual(['team/new', 'team/new/child'], plan.create)
+        self.assertEqual(['team', 'team/service'], plan.update)
+        self.assertEqual(['team/old/deeper', 'team/old'], plan.delete)
+        self.assertEqual({'team/service': (['c'], ['b'])}, plan.view_changes)
+
+    def test_scope(self):
+        plan = snapshot.plan_sync(self.remote, {'team': ['a']},
+                                  scope=set(['team', 'other']))
+        self.assertIn('other', plan.delete)
+
+
+class TestMoveDetection(TestCase):
+
+    def setUp(self):
+        super(TestMoveDetection, self).setUp()
+        self.jenkins = self.useFixture(FakeJenkins())
+        self.client = JenkinsClient(self.jenkins.url)
+        for name in ['team', 'team/service', 'team/service/build',
+                     'team/service/deploy', 'team/empty', 'archive']:
+            views = ['pipeline'] if name == 'team/service' else []
+            self.jenkins.add(name, views=views)
+        self.remote = snapshot.Snapshot.fetch(self.client)
+
+    def test_rename(self):
+        plan = snapshot.plan_sync(self.remote, {
+            'team': [],
+            'team/api': ['pipeline'],
+            'team/api/build': [],
+            'team/api/deploy': [],
+        })
+        self.assertEqual([('team/service', 'team/api')], plan.moves)
+        self.assertEqual([], plan.create)
+        self.assertEqual(['team/empty'], plan.delete)
+        self.assertEqual(['team', 'team/api', 'team/api/build',
+                          'team/api/deploy'], plan.update)
+
+    def test_rename_top_level(self):
+        plan = snapshot.plan_sync(self.remote, {
+            'squad': [],
+            'squad/service': ['pipeline'],
+            'squad/service/build': [],
+            'squad/service/deploy': [],
+            'squad/empty': [],
+        })
+        self.assertEqual([('team', 'squad')], plan.moves)
+        self.assertEqual([], plan.create)
+        self.assertEqual([], plan.delete)
+        self.assertEqual(['squad', 'squad/empty', 'squad/service',
+                          'squad/service/build', 'squad/service/deploy'],
+                         plan.update)
+
+    def test_move_with_changed_children(self):
+        plan = snapshot.plan_sync(self.remote, {
+            'team': [],
+            'team/empty': [],
+            'archive': {'views': []},
+            'archive/service': {'views': ['pipeline']},
+            'archive/service/build': [],
+            'archive/service/deploy': [],
+        }, scope=set(['team', 'archive']))
+        self.assertEqual([('team/service', 'archive/service')], plan.moves)
+        self.assertEqual([], plan.delete)
+
+        for action, args in plan.operations():
+            if action == 'move':
+                self.client.relocate(*args)
+        self.assertIn('archive/service/deploy', self.jenkins.items)
+        self.assertNotIn('team/service', self.jenkins.items)
+
+    def test_ambiguous_fingerprints_are_not_moves(self):
+        self.jenkins.add('team/copy', views=['pipeline'])
+        self.jenkins.add('team/copy/build')
+        self.jenkins.add('team/copy/deploy')
+        remote = snapshot.Snapshot.fetch(self.client)
+        plan = snapshot.plan_sync(remote, {
+            'team': [],
+            'team/api': ['pipeline'],
+            'team/api/build': [],
+            'team/api/deploy': [],
+        })
+        self.assertEqual([], plan.moves)
+        self.assertIn('team/api', plan.create)
+
+    def test_relocate_and_rename(self):
+        self.client.relocate('team/service', 'archive/api')
+        self.assertIn('archive/api/build', self.jenkins.items)
+        self.assertEqual(['archive/api'], self.jenkins.children['archive'])
+
+    def test_detection_can_be_disabled(self):
+        plan = snapshot.plan_sync(self.remote, {
+            'team': [],
+            'team/api': ['pipeline'],
+            'team/api/build': [],
+            'team/api/deploy': [],
+        }, detect_moves=False)
+        self.assertEqual([], plan.moves)
+        self.assertIn('team/service', plan.delete)
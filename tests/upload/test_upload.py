@@ -0,0 +1,87 @@
+""" Test overlapped generation and upload against a slow fake Jenkins"""
+from jenkins_jobs.xml_config import XmlJob
+from testtools import TestCase
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import upload
+from jenkins_jobs_addons.remote import JenkinsClient
+from tests.fake_jenkins import FakeJenkins
+
+LATENCY = 0.05
+
+
+def definitions(count):
+    yield {'name': 'team', 'primary-view': 'All'}
+    for i in range(count - 1):
+        yield {'name': 'team/f{0}'.format(i), 'primary-view': 'All'}
+
+
+def xml_jobs(definitions):
+    project = folders.Folder(None)
+    for data in definitions:
+        yield XmlJob(project.root_xml(data), data['name'])
+
+
+class TestUploadPipeline(TestCase):
+
+    def setUp(self):
+        super(TestUploadPipeline, self).setUp()
+        self.jenkins = self.useFixture(FakeJenkins(latency=LATENCY))
+        self.client = JenkinsClient(self.jenkins.url)
+
+    def test_uploads_overlap(self):
+        pipeline = upload.UploadPipeline(
+            upload.client_uploader(self.client, existing=set()), workers=8)
+        failed = pipeline.run(upload.generate(xml_jobs(definitions(40))))
+        self.assertEqual([], failed)
+        self.assertEqual(41, len(self.jenkins.items))
+        self.assertEqual(40, self.client.requests)
+        # sequential uploads would never have two requests in flight
+        self.assertGreater(self.jenkins.max_in_flight, 1)
+        stats = pipeline.stats()
+        self.assertEqual(40, stats['generate']['items'])
+        self.assertEqual(40, stats['upload']['items'])
+        self.assertEqual(stats['generate']['bytes'], stats['upload']['bytes'])
+
+    def test_backpressure(self):
+        generated = []
+
+        def slow_items():
+            for item in upload.generate(xml_jobs(definitions(10))):
+                generated.append(item[0])
+                yield item
+
+        pipeline = upload.UploadPipeline(
+            upload.client_uploader(self.client, existing=set()),
+            workers=1, queue_size=2)
+        pipeline.run(slow_items())
+        self.assertLessEqual(pipeline.max_queue_depth, 2)
+        self.assertGreater(pipeline.backpressure_seconds, LATENCY)
+
+    def test_update_or_create(self):
+        self.jenkins.add('team')
+        pipeline = upload.UploadPipeline(upload.client_uploader(self.client))
+        failed = pipeline.run(upload.generate(xml_jobs(definitions(3))))
+        self.assertEqual([], failed)
+        self.assertEqual(['', 'team', 'team/f0', 'team/f1'],
+                         sorted(self.jenkins.items))
+
+    def test_failed_parent_fails_children(self):
+        items = [{'name': 'missing/team'}, {'name': 'missing/team/child'}]
+        pipeline = upload.UploadPipeline(
+            upload.client_uploader(self.client, existing=set()))
+        failed = pipeline.run(upload.generate(xml_jobs(items)))
+        self.assertEqual(['missing/team', 'missing/team/child'],
+                         sorted(name for name, _ in failed))
+        self.assertEqual(1, self.client.requests)
+
+    def test_skips_unchanged(self):
+        digests = {}
+        names = [name for name, _ in
+                 upload.generate(xml_jobs(definitions(3)), digests=digests)]
+        self.assertEqual(['team', 'team/f0', 'team/f1'], names)
+        self.assertEqual(set(names), set(digests))
+        changed = list(definitions(3))
+        changed[1]['primary-view'] = 'Other'
+        names = [name for name, _ in
+                 upload.generate(xml_jobs(changed), digests=digests)]
+        self.assertEqual(['team/f0'], names)
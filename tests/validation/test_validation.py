@@ -0,0 +1,196 @@
+""" Test the up-front validation of folder and view definitions"""
+import os
+import fixtures
+from testtools import TestCase
+from jenkins_jobs_addons import validation
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BAD = """\
+- job:
+    name: team
+    project-type: folder
+    primary_view: All
+    description: not ours, not reported
+    build-discarder:
+      days-to-keep: 0
+    views:
+      - delivery_pipeline:
+          name: pipeline
+          sorting: latest
+          csss-url: https://example.com/style.css
+      - build_pipeline:
+          console-output-link-style: Popup
+      - buld_pipeline: {}
+"""
+
+TEMPLATE = """\
+- job-template:
+    name: '{team}'
+    project-type: multibranch
+    periodic-folder-trigger: '{interval}'
+    libraries: !include libraries.yaml
+    scm:
+      - git:
+          remote: '{remote}'
+"""
+
+
+class TestValidation(TestCase):
+
+    def setUp(self):
+        super(TestValidation, self).setUp()
+        self.tmp = self.useFixture(fixtures.TempDir()).path
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_fixtures(self):
+        fixture_dirs = [os.path.join(TESTS_DIR, name, 'fixtures')
+                        for name in ('folders', 'multibranch', 'views')]
+        problems = validation.validate_paths(fixture_dirs, 1)
+        # the older view fixtures keep the legacy option names
+        self.assertEqual([
+            ('build_pipeline_view.yaml', 11, 'csss-url, did you mean '
+                                             'css-url?'),
+            ('delivery_pipeline.yaml', 10, 'build-view-title'),
+            ('delivery_pipeline_old_plugin.yaml', 10, 'build-view-title'),
+        ], [(os.path.basename(problem.path), problem.line,
+             problem.message.rpartition('.')[2]) for problem in problems])
+
+    def test_problems_with_lines(self):
+        path = self.write('bad.yaml', BAD)
+        problems = validation.validate_file(path)
+        self.assertEqual([4, 7, 11, 12, 14, 15],
+                         [problem.line for problem in problems])
+        self.assertEqual(set([path]), set(p.path for p in problems))
+        messages = '\n'.join(p.message for p in problems)
+        self.assertIn('primary_view, did you mean primary-view?', messages)
+        self.assertIn('csss-url, did you mean css-url?', messages)
+        self.assertIn('unknown view type buld_pipeline', messages)
+        self.assertIn("not 'Popup'", messages)
+        self.assertNotIn('description', messages)
+
+    def test_templates_and_tags_are_skipped(self):
+        path = self.write('template.yaml', TEMPLATE)
+        self.assertEqual([], validation.validate_file(path))
+
+    def test_booleans_like_the_builders(self):
+        path = self.write('bools.yaml', """\
+- job:
+    name: team
+    project-type: folder
+    views:
+      - build_pipeline:
+          filter-queue: 'yes'
+          filter-executors: On
+          trigger-only-latest-job: maybe
+""")
+        problems = validation.validate_file(path)
+        self.assertEqual([8], [problem.line for problem in problems])
+        self.assertIn("must be a boolean, not 'maybe'", problems[0].message)
+
+    def test_missing_required_option(self):
+        problems = validation.validate_data({
+            'name': 'org', 'project-type': 'organization-folder',
+            'github': {'credentials-id': 'bot'}})
+        self.assertEqual(1, len(problems))
+        self.assertIn('github is missing repo-owner', problems[0].message)
+        self.assertIsNone(problems[0].line)
+
+    def test_invalid_yaml(self):
+        path = self.write('broken.yaml', '- job:\n    name: [x\n')
+        problems = validation.validate_file(path)
+        self.assertEqual(1, len(problems))
+        self.assertIn('invalid YAML', problems[0].message)
+
+    def test_parallel_matches_serial(self):
+        for index in range(6):
+            self.write('bad{0}.yaml'.format(index), BAD)
+        self.write('template.yaml', TEMPLATE)
+        serial = validation.validate_paths([self.tmp], 1)
+        self.assertEqual(36, len(serial))
+        self.assertEqual(serial, validation.validate_paths([self.tmp], 3))
+
+    def test_assert_valid(self):
+        self.write('bad.yaml', BAD)
+        e = self.assertRaises(validation.ValidationFailed,
+                              validation.assert_valid, [self.tmp], 1)
+        self.assertEqual(6, len(e.problems))
+        self.assertIn('bad.yaml:4: job team:', str(e))
+
+    def test_main(self):
+        self.write('template.yaml', TEMPLATE)
+        self.assertEqual(0, validation.main([self.tmp]))
+
+    def test_view_defaults_and_primary_view(self):
+        path = self.write('defaults.yaml', """\
+- job:
+    name: team
+    project-type: folder
+    primary-view: Buld
+    view-defaults:
+      build_pipline:
+        folder: true
+    views:
+      - build_pipeline:
+          name: Build
+""")
+        problems = validation.validate_file(path)
+        self.assertEqual([4, 6], [problem.line for problem in problems])
+        self.assertIn('primary-view Buld is not one of the views',
+                      problems[0].message)
+        self.assertIn('did you mean build_pipeline?', problems[1].message)
+
+    def test_primary_view_named_by_defaults(self):
+        path = self.write('named.yaml', """\
+- defaults:
+    name: global
+    view-defaults:
+      build_pipeline:
+        name: Build
+- defaults:
+    name: team
+    view-defaults:
+      build_pipeline:
+        name: Team
+- job:
+    name: a
+    project-type: folder
+    primary-view: Build
+    views:
+      - build_pipeline: {}
+- job:
+    name: b
+    project-type: folder
+    defaults: team
+    primary-view: Build
+    views:
+      - build_pipeline: {}
+- job:
+    name: c
+    project-type: folder
+    defaults: elsewhere
+    primary-view: Build
+    views:
+      - build_pipeline: {}
+""")
+        problems = validation.validate_file(path)
+        self.assertEqual([21], [problem.line for problem in problems])
+        self.assertIn("job b: primary-view Build is not one of the views "
+                      "['Team']", problems[0].message)
+
+    def test_computed_folder_views(self):
+        problems = validation.validate_data({
+            'name': 'svc', 'project-type': 'multibranch',
+            'primary-view': 'All', 'views': ['all']})
+        self.assertEqual(['job svc: primary-view is not supported, Jenkins '
+                          'computes the views of multibranch projects and '
+                          'organization folders',
+                          'job svc: views is not supported, Jenkins computes '
+                          'the views of multibranch projects and '
+                          'organization folders'],
+                         [problem.message for problem in problems])
@@ -0,0 +1,47 @@
+""" Test the incremental view generation API"""
+import xml.etree.ElementTree as ET
+from testtools import TestCase
+from jenkins_jobs_addons import views
+from jenkins_jobs_addons import xml_backend
+from tests.fake_registry import Registry
+
+
+class TestIterViews(TestCase):
+
+    def setUp(self):
+        super(TestIterViews, self).setUp()
+        self.views = views.Views(Registry())
+        self.data = {'views': [
+            {'all': {}},
+            {'delivery_pipeline': {'name': 'deliver'}},
+            {'build_pipeline': {'name': 'build'}},
+            {'build_pipeline': {'name': 'build'}},
+        ]}
+
+    def test_yields_each_view(self):
+        generated = list(self.views.iter_views(None, self.data))
+        self.assertEqual(['All', 'deliver', 'build', 'build'],
+                         [name for name, _, _ in generated])
+        digests = [digest for _, _, digest in generated]
+        self.assertEqual(digests[2], digests[3])
+        self.assertEqual(3, len(set(digests)))
+
+    def test_is_lazy(self):
+        iterator = self.views.iter_views(None, {'views': [
+            {'all': {}}, {'unknown': {}}]})
+        self.assertEqual('All', next(iterator)[0])
+        self.assertRaises(KeyError, next, iterator)
+
+    def test_gen_xml(self):
+        xml_parent = ET.Element('project')
+        self.views.gen_xml(None, xml_parent, self.data)
+        names = [view.findtext('name') for view in xml_parent.find('views')]
+        self.assertEqual(['All', 'deliver', 'build', 'build'], names)
+
+    def test_follows_parent_backend(self):
+        if 'lxml' not in xml_backend.BACKENDS:
+            self.skipTest('lxml is not installed')
+        xml_parent = ET.Element('project')
+        for _, element, _ in self.views.iter_views(None, self.data,
+                                                   xml_parent):
+            self.assertIs(ET, xml_backend.backend_of(element))
@@ -0,0 +1,35 @@
+""" Test that the legacy CSS option names still produce the same XML"""
+import xml.etree.ElementTree as ET
+from testtools import TestCase
+from jenkins_jobs_addons import views
+
+
+def render(builder, data):
+    xml_parent = ET.Element('views')
+    builder(None, xml_parent, data)
+    return ET.tostring(xml_parent)
+
+
+class TestLegacyCssOptions(TestCase):
+
+    def test_build_pipeline(self):
+        self.assertEqual(
+            render(views.build_pipeline_view,
+                   {'name': 'b', 'css-url': 'https://example.com/a.css'}),
+            render(views.build_pipeline_view,
+                   {'name': 'b', 'csss-url': 'https://example.com/a.css'}))
+
+    def test_delivery_pipeline(self):
+        documented = render(views.delivery_pipeline_view, {
+            'name': 'd',
+            'fullscreen-css-url': 'https://example.com/full.css',
+            'css-url': 'https://example.com/embedded.css'})
+        legacy = render(views.delivery_pipeline_view, {
+            'name': 'd',
+            'csss-url': 'https://example.com/full.css',
+            'fullscreen-csss-url': 'https://example.com/embedded.css'})
+        self.assertEqual(documented, legacy)
+        self.assertIn(b'<fullScreenCss>https://example.com/full.css<',
+                      legacy)
+        self.assertIn(b'<embeddedCss>https://example.com/embedded.css<',
+                      legacy)
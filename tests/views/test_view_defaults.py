@@ -0,0 +1,128 @@
+""" Test view defaults and interned view specs"""
+import xml.etree.ElementTree as ET
+from testtools import TestCase
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import views
+from jenkins_jobs_addons import xml_backend
+from tests.fake_registry import Registry
+
+DEFAULTS = {'build_pipeline': {'folder': True, 'first-job': 'build',
+                               'display-number-of-builds': 5}}
+
+
+def folder(name, view_defaults=DEFAULTS):
+    return {'name': name, 'view-defaults': view_defaults, 'views': [
+        {'build_pipeline': {'name': 'build'}},
+        {'build_pipeline': {'name': 'release', 'first-job': 'release'}},
+        'all',
+    ]}
+
+
+class Parser(object):
+    """Holds parsed defaults like the Jenkins Job Builder YAML parser"""
+
+    def __init__(self, global_defaults, **defaults):
+        defaults['global'] = global_defaults
+        self.data = {'defaults': defaults}
+
+
+class TestViewDefaults(TestCase):
+
+    def setUp(self):
+        super(TestViewDefaults, self).setUp()
+        self.views = views.Views(Registry())
+
+    def generate(self, data, parser=None, backend=ET):
+        xml_parent = backend.Element('project')
+        self.views.gen_xml(parser, xml_parent, data)
+        return xml_parent.find('views')
+
+    def test_merge_order(self):
+        merged = views.merge_view(
+            'build_pipeline', {'name': 'x'},
+            {'build_pipeline': {'first-job': 'a', 'folder': False}},
+            {'build_pipeline': {'folder': True}})
+        self.assertEqual({'name': 'x', 'first-job': 'a', 'folder': True},
+                         merged)
+
+    def test_folder_defaults(self):
+        generated = self.generate(folder('team'))
+        build, release, all_view = list(generated)
+        self.assertEqual('build', build.findtext('gridBuilder/firstJob'))
+        self.assertEqual('release', release.findtext('gridBuilder/firstJob'))
+        self.assertEqual('5', release.findtext('noOfDisplayedBuilds'))
+        self.assertIsNotNone(build.find('owner'))
+        self.assertEqual('All', all_view.findtext('name'))
+
+    def test_global_defaults(self):
+        parser = Parser({'view-defaults': {'build_pipeline': {
+            'first-job': 'global', 'refresh-frequency': 30}}})
+        generated = self.generate(folder('team', {}), parser)
+        build = generated[0]
+        self.assertEqual('global', build.findtext('gridBuilder/firstJob'))
+        self.assertEqual('30', build.findtext('refreshFrequency'))
+        generated = self.generate(folder('team'), parser)
+        self.assertEqual('build', generated[0].findtext(
+            'gridBuilder/firstJob'))
+        self.assertEqual('30', generated[0].findtext('refreshFrequency'))
+
+    def test_named_defaults_replace_global(self):
+        parser = Parser(
+            {'view-defaults': {'build_pipeline': {
+                'first-job': 'from-global', 'refresh-frequency': 30}}},
+            team={'view-defaults': {'build_pipeline': {
+                'first-job': 'from-team'}}},
+            bare={})
+        data = folder('team', {})
+        data['defaults'] = 'team'
+        build = self.generate(data, parser)[0]
+        self.assertEqual('from-team', build.findtext('gridBuilder/firstJob'))
+        self.assertEqual('3', build.findtext('refreshFrequency'))
+        data['defaults'] = 'bare'
+        build = self.generate(data, parser)[0]
+        self.assertEqual('', build.findtext('gridBuilder/firstJob'))
+        self.assertEqual('3', build.findtext('refreshFrequency'))
+
+    def test_specs_are_shared_and_elements_are_not(self):
+        first = self.generate(folder('a'))
+        second = self.generate(folder('b', dict(DEFAULTS)))
+        self.assertEqual(3, len(self.views.specs))
+        self.assertEqual(3, self.views.specs.hits)
+        for mine, theirs in zip(first, second):
+            self.assertIsNot(mine, theirs)
+            self.assertEqual(ET.tostring(mine), ET.tostring(theirs))
+        # changing the views of one job leaves the others alone
+        first[0].find('name').text = 'mine'
+        third = self.generate(folder('c'))
+        self.assertEqual('build', second[0].findtext('name'))
+        self.assertEqual('build', third[0].findtext('name'))
+
+    def test_lxml_subtrees_are_copied(self):
+        if 'lxml' not in xml_backend.BACKENDS:
+            self.skipTest('lxml is not installed')
+        lxml_etree = xml_backend.BACKENDS['lxml']
+        first = self.generate(folder('a'), backend=lxml_etree)
+        second = self.generate(folder('b'), backend=lxml_etree)
+        self.assertEqual(3, len(first))
+        self.assertEqual(3, len(second))
+        self.assertEqual(lxml_etree.tostring(first),
+                         lxml_etree.tostring(second))
+        first[0].find('name').text = 'mine'
+        third = self.generate(folder('c'), backend=lxml_etree)
+        self.assertEqual('build', third[0].findtext('name'))
+
+    def test_view_index(self):
+        self.assertEqual({'build': 0, 'release': 1, 'All': 2},
+                         views.view_index(folder('a')))
+        self.assertEqual(
+            {'named-by-default': 0},
+            views.view_index({'views': ['build_pipeline']},
+                             {'build_pipeline': {'name': 'named-by-default'}}))
+
+    def test_primary_view_is_not_checked_when_generating(self):
+        # the view may be named by defaults the folder module cannot see,
+        # jenkins_jobs_addons.validation checks it
+        data = {'name': 'team', 'primary-view': 'named-by-default',
+                'views': ['build_pipeline']}
+        xml = folders.Folder(None).root_xml(data)
+        self.assertEqual('named-by-default', xml.findtext('primaryView'))
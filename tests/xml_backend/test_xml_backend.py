@@ -0,0 +1,89 @@
+""" Test that both XML backends generate the same output"""
+import os
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+import yaml
+from jenkins_jobs.modules import general
+from testtools import TestCase
+from jenkins_jobs_addons import folders
+from jenkins_jobs_addons import multibranch
+from jenkins_jobs_addons import views
+from jenkins_jobs_addons import xml_backend
+from tests.fake_registry import BUILDERS
+
+TESTS_PATH = os.path.dirname(os.path.dirname(__file__))
+
+
+def load_fixture(*path):
+    with open(os.path.join(TESTS_PATH, *path)) as fixture:
+        return yaml.safe_load(fixture)
+
+
+def pretty(element):
+    # Same serialization as jenkins_jobs.xml_config.XmlJob.output
+    out = minidom.parseString(ET.tostring(element, encoding='UTF-8'))
+    return out.toprettyxml(indent='  ', encoding='utf-8')
+
+
+class TestXmlBackend(TestCase):
+
+    def setUp(self):
+        super(TestXmlBackend, self).setUp()
+        if 'lxml' not in xml_backend.BACKENDS:
+            self.skipTest('lxml is not installed')
+        self.addCleanup(xml_backend.set_backend,
+                        xml_backend.get_backend())
+
+    def _generate(self, backend, data):
+        xml_backend.set_backend(backend)
+        with xml_backend.owned():
+            xml_parent = folders.Folder(None).root_xml(data)
+        views_xml = xml_backend.SubElement(xml_parent, 'views')
+        for view in data.get('views', []):
+            for view_type, view_data in view.items():
+                BUILDERS[view_type](None, views_xml, view_data)
+        return xml_parent
+
+    def test_backends_match(self):
+        for fixture in ('all_view', 'build_pipeline_view',
+                        'delivery_pipeline'):
+            data = load_fixture('views', 'fixtures', fixture + '.yaml')
+            lxml_xml = self._generate('lxml', data)
+            etree_xml = self._generate('etree', data)
+            self.assertIs(xml_backend.lxml_etree,
+                          xml_backend.backend_of(lxml_xml))
+            self.assertIs(ET, xml_backend.backend_of(etree_xml))
+            self.assertEqual(pretty(etree_xml), pretty(lxml_xml))
+
+    def test_subelement_follows_parent(self):
+        xml_backend.set_backend('lxml')
+        parent = ET.Element('project')
+        views.all_view(None, parent, {})
+        self.assertIs(ET, xml_backend.backend_of(parent[0]))
+
+    def test_roots_for_jenkins_job_builder(self):
+        xml_backend.set_backend('lxml')
+        roots = [
+            folders.Folder(None).root_xml({'name': 'team'}),
+            multibranch.Multibranch(None).root_xml({
+                'name': 'team/svc',
+                'scm': [{'git': {'remote': 'https://example.com/svc'}}]}),
+        ]
+        for xml_parent in roots:
+            self.assertIs(ET, xml_backend.backend_of(xml_parent))
+            # Jenkins Job Builder modules run on the root afterwards
+            general.General(None).gen_xml(xml_parent, {
+                'name': 'x', 'description': 'managed', 'disabled': False})
+            self.assertEqual('managed', xml_parent.findtext('description'))
+
+    def test_owned_trees(self):
+        xml_backend.set_backend('lxml')
+        with xml_backend.owned():
+            xml_parent = folders.Folder(None).root_xml({'name': 'team'})
+        self.assertIs(xml_backend.lxml_etree,
+                      xml_backend.backend_of(xml_parent))
+        self.assertIs(ET, xml_backend.backend_of(
+            folders.Folder(None).root_xml({'name': 'team'})))
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, xml_backend.set_backend, 'nope')